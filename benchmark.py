@@ -0,0 +1,181 @@
+"""micro-benchmarks of the engine hot paths on a fixed set of positions
+
+    python benchmark.py                        # print ops/sec and allocations
+    python benchmark.py --save baseline.json   # also store the results as a baseline
+    python benchmark.py --compare baseline.json --threshold 0.2
+                                               # exit with status 1 if a benchmark is more
+                                               # than 20% slower than the baseline
+"""
+import argparse
+import json
+import random
+import sys
+import tracemalloc
+from time import perf_counter
+
+import numpy as np
+
+from blokus.blokus_game import BlokusGame
+from greedyplayer import GreedyCombination
+from mcts import MonteCarloTreeSearch
+
+# positions, as the moves played from the start (one random game, seed 2023)
+GAME = [5510, 12347, 6968, 14661, 8547, 15639, 6635, 13015, 4445, 14993, 10647, 17647,
+        5929, 12644, 3485, 11283, 1997, 10037, 1819]
+POSITIONS = {'opening': GAME[:0], 'early': GAME[:4], 'midgame': GAME[:10], 'late': GAME[:16]}
+
+SEED = 2023
+
+
+def position(moves):
+    """returns the game after playing moves from the start"""
+    game = BlokusGame()
+    for move in moves:
+        game.play_action(move)
+    return game
+
+
+def benchmarks(game):
+    """
+    Returns {name: function} of the timed operations on a position. Each function does
+    one operation and leaves the position as it found it: play_action is timed together
+    with the undo_action restoring the position, roll_out with the clone it plays on,
+    check_game_over with its move cache cleared, select_node with the removal of the node
+    it added. select_node descends a fixed tree searched until every move of the root has
+    a child, so each call goes past the first level.
+    """
+    player = game.current_player
+    valid = np.flatnonzero(game.get_valid_moves(player))
+    move = int(valid[len(valid) // 2])
+
+    mcts = MonteCarloTreeSearch(game, transposition_size=0, light_rollouts=True)
+    mcts.search(iterations=2 * len(valid) + 50)
+    tree = mcts.tree
+    greedy = GreedyCombination(game)
+
+    def check_game_over():
+        game.move_cache = {}
+        game.check_game_over(player)
+
+    def play_action():
+        game.play_action(move)
+        game.undo_action()
+
+    def select_node():
+        size, edges, slots = tree.size, tree.edges, tree.slots
+        mcts.select_node()
+        # a selection adds at most one node, expanding its parent if it was a leaf
+        for child in range(size, tree.size):
+            parent = tree.parent[child]
+            tree.tried[parent] -= 1
+            tree.edge_child[tree.first_edge[parent] + tree.tried[parent]] = -1
+            if tree.first_edge[parent] >= edges:
+                tree.edge_count[parent] = 0
+        tree.size, tree.edges, tree.slots = size, edges, slots
+
+    return {
+        'get_legal_moves': lambda: game.get_legal_moves(player),
+        'get_valid_moves': lambda: game.get_valid_moves(player),
+        'play_action': play_action,
+        'check_game_over': check_game_over,
+        'translate_action': lambda: game.translate_action(move),
+        'roll_out': lambda: MonteCarloTreeSearch.roll_out(game.clone()),
+        'select_node': select_node,
+        'choose_move': lambda: greedy.choose_move(game),
+    }
+
+
+def time_function(function, min_time, repeats=3):
+    """returns the best ops/sec over repeats runs of at least min_time seconds"""
+    best = 0.0
+    for _ in range(repeats):
+        count = 0
+        start = perf_counter()
+        elapsed = 0.0
+        while elapsed < min_time:
+            function()
+            count += 1
+            elapsed = perf_counter() - start
+        best = max(best, count / elapsed)
+    return best
+
+
+def allocations(function, calls=5):
+    """returns the mean number of bytes and blocks allocated and kept, and the peak, per call"""
+    tracemalloc.start()
+    function()  # warm up caches
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    blocks = len(tracemalloc.take_snapshot().traces)
+    peak = 0
+    for _ in range(calls):
+        function()
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+    after, _ = tracemalloc.get_traced_memory()
+    blocks = len(tracemalloc.take_snapshot().traces) - blocks
+    tracemalloc.stop()
+    return {'retained_bytes': (after - before) / calls, 'retained_blocks': blocks / calls,
+            'peak_bytes': peak}
+
+
+def run(min_time, only=None):
+    """
+    Runs every benchmark on every stored position.
+
+    Returns:
+        {"<benchmark>/<position>": {"ops_per_sec": ..., "peak_bytes": ..., ...}}
+    """
+    results = {}
+    for name, moves in POSITIONS.items():
+        random.seed(SEED)
+        np.random.seed(SEED)
+        for bench, function in benchmarks(position(moves)).items():
+            if only and bench not in only:
+                continue
+            key = bench + "/" + name
+            results[key] = {'ops_per_sec': time_function(function, min_time)}
+            results[key].update(allocations(function))
+            print("%-28s %12.1f ops/sec %12d peak bytes"
+                  % (key, results[key]['ops_per_sec'], results[key]['peak_bytes']))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Prints the speed of every benchmark relative to the baseline and returns the keys of
+    those slower than (1 - threshold) times the baseline.
+    """
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        ratio = result['ops_per_sec'] / baseline[key]['ops_per_sec']
+        flag = ""
+        if ratio < 1 - threshold:
+            regressions.append(key)
+            flag = "  REGRESSION"
+        print("%-28s %6.2fx baseline%s" % (key, ratio, flag))
+    return regressions
+
+
+parser = argparse.ArgumentParser(description="Micro-benchmarks of the engine hot paths.")
+parser.add_argument("--time", help="Minimum seconds per timing run.", type=float, default=0.2)
+parser.add_argument("--only", help="Benchmarks to run (default: all).", nargs="*")
+parser.add_argument("--save", help="Write the results to this baseline JSON file.")
+parser.add_argument("--compare", help="Baseline JSON file to compare the results with.")
+parser.add_argument("--threshold", help="Allowed slowdown before failing a comparison.",
+                    type=float, default=0.2)
+
+if __name__ == '__main__':
+    arguments = parser.parse_args()
+    results = run(arguments.time, arguments.only)
+    if arguments.save:
+        with open(arguments.save, "w") as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+    if arguments.compare:
+        with open(arguments.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, arguments.threshold)
+        if regressions:
+            print(len(regressions), "benchmarks regressed beyond", arguments.threshold)
+            sys.exit(1)
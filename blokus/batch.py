@@ -0,0 +1,248 @@
+"""Lockstep simulation of many Blokus Duo games at once with NumPy."""
+import numpy as np
+
+from blokus.piece import All_Pieces
+from blokus.placements import ACTION_SIZE, BOARD_SIZE, NUM_SHAPES, get_table
+
+# starting corner of each player (index 0 for player 1, 1 for player -1)
+START = np.array([4 * BOARD_SIZE + 4, (BOARD_SIZE - 5) * BOARD_SIZE + BOARD_SIZE - 5])
+
+
+def _twin_pairs(table):
+    """
+    Returns (ids, better, starts): for every action id that get_legal_moves drops when one
+    of its twins is also legal, the twins it gives way to, grouped by id (better[starts[k]:
+    starts[k + 1]] belong to ids[k]). As in unique_placements, a twin gives way to the ones
+    with a lower anchor, then an earlier enumeration rank.
+    """
+    twins = np.flatnonzero(table.twin & table.on_board)
+    keys = table.anchor[twins].astype(np.int64) * NUM_SHAPES + table.rank[twins]
+    groups = {}
+    for action, key in zip(twins.tolist(), keys.tolist()):
+        groups.setdefault(int(table.placement[action]), []).append((key, action))
+    pairs = []
+    for members in groups.values():
+        members.sort()
+        for k, (_, action) in enumerate(members):
+            pairs.extend((action, better) for (_, better) in members[:k])
+    pairs.sort()
+    ids, better = np.array(pairs, dtype=np.int64).T
+    ids, starts = np.unique(ids, return_index=True)
+    return ids, better, starts
+
+
+class BatchGame(object):
+    """
+    N games of Blokus Duo advanced in lockstep, each one playing one move (or passing) per
+    step. The rules, the move list (twins dropped, invalid moves removed) and the passing
+    convention are those of BlokusGame and the Tester loops: a player without a move
+    passes, and a game ends after two passes in a row.
+
+    Attributes:
+        boards (N x 14 x 14 int8): 1 and -1 for the cells of each player, 0 when empty.
+        pieces (N x 2 int64): remaining pieces of players 1 and -1, bit k set while
+                              All_Pieces[k] is unplayed.
+        score (N x 2 int64): cells covered by players 1 and -1.
+        corners (N x 2 x 196 bool): corner cells of players 1 and -1, kept as
+                                    BlokusGame.corners is (they score the heuristic).
+        rounds (N): moves played in each game.
+        current_player (N int8): player to move in each game.
+        passes (N): passes in a row in each game.
+    """
+
+    def __init__(self, num_games, seed=None):
+        n = BOARD_SIZE
+        self.num_games = num_games
+        self.boards = np.zeros((num_games, n, n), dtype=np.int8)
+        self.pieces = np.full((num_games, 2), (1 << len(All_Pieces)) - 1, dtype=np.int64)
+        self.score = np.zeros((num_games, 2), dtype=np.int64)
+        self.corners = np.zeros((num_games, 2, n * n), dtype=bool)
+        self.corners[:, [0, 1], START] = True
+        self.rounds = np.zeros(num_games, dtype=np.int64)
+        self.current_player = np.ones(num_games, dtype=np.int8)
+        self.passes = np.zeros(num_games, dtype=np.int64)
+        self.rng = np.random.default_rng(seed)
+
+    @classmethod
+    def from_games(cls, games, seed=None):
+        """creates a batch continuing from a list of BlokusGame positions, e.g. rollout leaves"""
+        n = BOARD_SIZE
+        batch = cls(len(games), seed)
+        for k, game in enumerate(games):
+            batch.boards[k] = game.state
+            batch.pieces[k] = (game.pieces[1], game.pieces[-1])
+            batch.score[k] = (game.score[1], game.score[-1])
+            batch.corners[k] = False
+            for side, player in enumerate([1, -1]):
+                for (i, j) in game.corners[player]:
+                    batch.corners[k, side, i * n + j] = True
+            batch.rounds[k] = game.rounds
+            batch.current_player[k] = game.current_player
+        return batch
+
+    def done(self):
+        """returns which games are over"""
+        return self.passes >= 2
+
+    def valid_moves(self):
+        """
+        returns an (N x 17836) boolean array of the valid moves of the player to move in
+        each game, the same set as BlokusGame.get_valid_moves (empty for finished games)
+        """
+        table = get_table()
+        n, count = BOARD_SIZE, self.num_games
+        flat = self.boards.reshape(count, n * n)
+        player = self.current_player.astype(np.int8)[:, None]
+        own = (flat == player).reshape(count, n, n)
+        empty = flat == 0
+
+        def spread(mask, steps):
+            padded = np.zeros((count, n + 2, n + 2), dtype=bool)
+            for (di, dj) in steps:
+                padded[:, 1 + di:n + 1 + di, 1 + dj:n + 1 + dj] |= mask
+            return padded[:, 1:-1, 1:-1].reshape(count, n * n)
+
+        # cells a piece may cover, and the anchors moves are generated from: in the first
+        # round the player's starting corner, then the cells touching its pieces diagonally
+        opening = (self.rounds < 2)[:, None]
+        allowed = empty & (opening | ~spread(own, [(1, 0), (-1, 0), (0, 1), (0, -1)]))
+        anchors = allowed & spread(own, [(1, 1), (-1, -1), (1, -1), (-1, 1)])
+        start = np.zeros_like(anchors)
+        start[np.arange(count), START[(self.current_player == -1).astype(int)]] = True
+        anchors = np.where(opening, start & empty, anchors)
+        anchors[self.done()] = False
+
+        games, cells = np.nonzero(anchors)
+        candidates = cells[:, None] * NUM_SHAPES + np.arange(NUM_SHAPES)
+        # index -1 (padding and cells off the board) reads the extra True at the end,
+        # moves off the board are removed by on_board
+        allowed = np.concatenate([allowed, np.ones((count, 1), dtype=bool)], axis=1)
+        fits = allowed[games[:, None, None], table.cells[candidates]].all(axis=2)
+        fits &= table.on_board[candidates]
+        mover = (self.current_player[games] == -1).astype(int)
+        remaining = self.pieces[games, mover][:, None] >> table.piece[candidates].astype(np.int64)
+        fits &= (remaining & 1).astype(bool)
+
+        valid = np.zeros((count, ACTION_SIZE), dtype=bool)
+        valid[np.repeat(games, NUM_SHAPES)[fits.ravel()], candidates[fits]] = True
+        ids, better, starts = _twins()
+        valid[:, ids] &= ~np.logical_or.reduceat(valid[:, better], starts, axis=1)
+        valid[:, table.invalid] = False
+        return valid
+
+    def sample_moves(self, valid):
+        """returns one move drawn uniformly from each row of valid, -1 for empty rows"""
+        counts = valid.sum(axis=1)
+        picks = (self.rng.random(self.num_games) * counts).astype(np.int64)
+        moves = np.argmax(np.cumsum(valid, axis=1) > picks[:, None], axis=1)
+        return np.where(counts > 0, moves, -1)
+
+    def play(self, moves):
+        """
+        plays one move per game, -1 passes. Finished games are left as they are.
+        """
+        live = ~self.done()
+        passing = live & (moves < 0)
+        self.passes[passing] += 1
+        playing = live & (moves >= 0)
+        self.passes[playing] = 0
+        self.place(np.flatnonzero(playing), moves[playing])
+        self.current_player[passing] *= -1
+
+    def place(self, games, actions):
+        """plays one action in each of the given games and hands the move to the other player"""
+        table = get_table()
+        n = BOARD_SIZE
+        player = self.current_player[games]
+        mover = (player == -1).astype(int)
+        cells = table.cells[actions]
+        used = cells >= 0
+        self.boards.reshape(-1, n * n)[np.repeat(games, used.sum(axis=1)), cells[used]] = \
+            np.repeat(player, used.sum(axis=1))
+        self.score[games, mover] += table.size[actions]
+        self.pieces[games, mover] &= ~(1 << table.piece[actions].astype(np.int64))
+        self.rounds[games] += 1
+
+        # as in BlokusGame.play_action: the mover gains the empty corner cells of the
+        # piece, the opponent loses its corner cells that are now covered
+        empty = self.boards.reshape(-1, n * n)[games] == 0
+        corners = table.corners[actions]
+        rows = np.repeat(np.arange(len(games)), corners.shape[1])
+        new = np.zeros((len(games), n * n + 1), dtype=bool)
+        new[rows, corners.ravel()] = True
+        new = new[:, :n * n] & empty
+        self.corners[games, mover] |= new
+        self.corners[games, 1 - mover] &= empty
+        self.current_player[games] *= -1
+
+    def heuristic(self, player):
+        """returns BlokusGame.heuristic of each game for the given players (one per game)"""
+        side = (player == -1).astype(int)
+        games = np.arange(self.num_games)
+        corners = self.corners.sum(axis=2)
+        return (corners[games, side] - corners[games, 1 - side]
+                + 2 * (self.score[games, side] - self.score[games, 1 - side]))
+
+    def roll_out(self, depth=10):
+        """
+        Plays MonteCarloTreeSearch.roll_out in every game at once: random moves until depth
+        moves were played, scored with the heuristic of the player to move at the start,
+        or until the player to move has no move, scored 100 or -100 by check_game_over
+        (0 while the other player can still move).
+
+        Returns:
+            (outcomes, actions): the outcome of each game and the list of actions it played
+        """
+        start = self.current_player.copy()
+        outcomes = np.zeros(self.num_games, dtype=np.int64)
+        actions = [[] for _ in range(self.num_games)]
+        active = np.ones(self.num_games, dtype=bool)
+        for _ in range(depth):
+            valid = self.valid_moves()
+            valid[~active] = False
+            moves = self.sample_moves(valid)
+            stuck = active & (moves < 0)
+            if stuck.any():
+                outcomes[stuck] = self.game_over_outcome(stuck)
+                active &= ~stuck
+            games = np.flatnonzero(active)
+            if len(games) == 0:
+                break
+            self.place(games, moves[games])
+            for k, move in zip(games.tolist(), moves[games].tolist()):
+                actions[k].append(move)
+        outcomes[active] = self.heuristic(start)[active]
+        return outcomes, actions
+
+    def game_over_outcome(self, games):
+        """
+        returns 100 times check_game_over's result for the games of the boolean mask games,
+        whose player to move has no move
+        """
+        self.current_player[games] *= -1
+        other_can_move = self.valid_moves().any(axis=1)
+        self.current_player[games] *= -1
+        side = (self.current_player == -1).astype(int)
+        rows = np.arange(self.num_games)
+        wins = self.score[rows, side] >= self.score[rows, 1 - side]
+        return np.where(other_can_move, 0, np.where(wins, 100, -100))[games]
+
+    def play_random(self):
+        """plays random moves in every game until all are over, returns the scores"""
+        while not self.done().all():
+            self.play(self.sample_moves(self.valid_moves()))
+        return self.scores()
+
+    def scores(self):
+        """returns the score of each game as a dict, like BlokusGame.score"""
+        return [{1: int(p1), -1: int(p2)} for (p1, p2) in self.score.tolist()]
+
+
+_pairs = None
+
+
+def _twins():
+    global _pairs
+    if _pairs is None:
+        _pairs = _twin_pairs(get_table())
+    return _pairs
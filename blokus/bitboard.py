@@ -0,0 +1,75 @@
+"""Bitboard masks for Blokus Duo, one bit per board cell (bit index = row * 14 + column)."""
+from blokus.placements import BOARD_SIZE, get_table
+
+
+def _cell_masks(steps):
+    masks = []
+    for i in range(BOARD_SIZE):
+        for j in range(BOARD_SIZE):
+            mask = 0
+            for (di, dj) in steps:
+                if 0 <= i + di < BOARD_SIZE and 0 <= j + dj < BOARD_SIZE:
+                    mask |= 1 << ((i + di) * BOARD_SIZE + j + dj)
+            masks.append(mask)
+    return masks
+
+
+CELL = _cell_masks([(0, 0)])
+EDGE = _cell_masks([(1, 0), (-1, 0), (0, 1), (0, -1)])
+DIAGONAL = _cell_masks([(1, 1), (-1, -1), (1, -1), (-1, 1)])
+
+
+def points_mask(points):
+    """returns the bitboard of a list of (row, column) points, which must be on the board"""
+    mask = 0
+    for (i, j) in points:
+        mask |= CELL[i * BOARD_SIZE + j]
+    return mask
+
+
+def neighbour_mask(points, cell_masks):
+    """returns the union of the per-cell masks (EDGE or DIAGONAL) of a list of points"""
+    mask = 0
+    for (i, j) in points:
+        mask |= cell_masks[i * BOARD_SIZE + j]
+    return mask
+
+
+def cells_mask(cells):
+    """returns the bitboard of a row of flat cells of the placement table, -1 being skipped"""
+    mask = 0
+    for c in cells:
+        if c >= 0:
+            mask |= CELL[c]
+    return mask
+
+
+class BitboardTable(object):
+    """
+    Bitboards of the action ids, (cells, edges, corners) of the placement table rows.
+    Only a few thousand ids are ever checked on bitboards, so the masks of an id are
+    built on its first use rather than for the whole table.
+    """
+
+    def __init__(self):
+        self.masks = {}
+
+    def __getitem__(self, action):
+        masks = self.masks.get(action)
+        if masks is None:
+            table = get_table()
+            masks = (cells_mask(table.cells[action].tolist()), cells_mask(table.edges[action].tolist()),
+                     cells_mask(table.corners[action].tolist()))
+            self.masks[action] = masks
+        return masks
+
+
+_masks = None
+
+
+def get_masks():
+    """returns the bitboard table, creating it on first use"""
+    global _masks
+    if _masks is None:
+        _masks = BitboardTable()
+    return _masks
@@ -1,49 +1,267 @@
-from copy import deepcopy
+from copy import copy
+import random
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from blokus.piece import All_Pieces
+from blokus.bitboard import DIAGONAL, EDGE, get_masks, neighbour_mask, points_mask
+from blokus.placements import get_table
+from blokus.symmetry import NUM_SYMMETRIES, SWAPS_COLOURS, get_symmetries
+from blokus import zobrist
 
 from game import Game
 
-invalid_moves = [line.strip() for line in open("invalid_moves.txt", 'r')]
-invalid_moves = [int(x) for x in invalid_moves]
+ALL_PIECES_MASK = (1 << len(All_Pieces)) - 1
+
+# layout of the flat int8 record written by BlokusGame.to_array: the board, each player's
+# corner cells and remaining pieces (players 1 then -1), rounds, current player and the
+# 8 bytes of the zobrist hash of each symmetric image of the position (see symmetric_hash)
+BOARD_CELLS = 14 * 14
+CORNERS_AT = BOARD_CELLS
+PIECES_AT = CORNERS_AT + 2 * BOARD_CELLS
+ROUNDS_AT = PIECES_AT + 2 * len(All_Pieces)
+PLAYER_AT = ROUNDS_AT + 1
+HASH_AT = PLAYER_AT + 1
+STATE_SIZE = HASH_AT + 8 * NUM_SYMMETRIES
 
 class BlokusGame(Game):
     """Class for Blokus Duo"""
 
     def __init__(self, n = 14):
         self.action_size = 17836
-        self.invalid_moves = invalid_moves
         self.size = n 
         self.rounds = 0
         self.current_player = 1
         self.state = np.zeros((n,n), dtype = np.int8)
-        self.pieces = {1: All_Pieces,
-                      -1: All_Pieces
+        # remaining pieces of each player, bit k set while All_Pieces[k] is unplayed
+        self.pieces = {1: ALL_PIECES_MASK,
+                      -1: ALL_PIECES_MASK
                         }
         self.score = {1: 0,
                       -1: 0}
+        # occupied cells of each player, one bit per cell
+        self.bitboards = {1: 0,
+                         -1: 0}
 
         self.corners = { 1: set([(4, 4)]), 
                         -1: set([(self.size -5, self.size-5)])}
-        
+        # legal moves of each player under the rules after the first round, kept up to
+        # date by play_action (see update_legal_moves)
+        self.legal = {1: np.zeros(self.action_size, dtype=bool),
+                     -1: np.zeros(self.action_size, dtype=bool)}
+        # one undo record per play_action, consumed by undo_action
+        self.history = []
+        # whether each player has a valid move in the current position, see has_any_move
+        self.move_cache = {}
+        # zobrist key of the placements made so far, see position_key
+        self.hash = 0
+        # zobrist keys of the placements' images under the exact symmetries other than
+        # the identity, see canonical_key
+        self.symmetric_hash = {s: 0 for s in get_symmetries().exact if s}
+
+    def clone(self):
+        """
+        Creates a copy of the game that shares nothing mutable with it: the board, scores,
+        corners, bitboards, piece inventories and legal move sets are copied, the lookup tables
+        are shared.
+        """
+        game = copy(self)
+        game.state = self.state.copy()
+        game.pieces = dict(self.pieces)
+        game.score = dict(self.score)
+        game.corners = {player: set(corners) for player, corners in self.corners.items()}
+        game.bitboards = dict(self.bitboards)
+        game.legal = {player: legal.copy() for player, legal in self.legal.items()}
+        game.history = list(self.history)
+        game.move_cache = dict(self.move_cache)
+        game.symmetric_hash = dict(self.symmetric_hash)
+        return game
+
+    def to_array(self, out=None):
+        """
+        Writes the position into a flat int8 array of STATE_SIZE entries (into out when
+        given, e.g. a row of a shared memory buffer) and returns it. The undo stack is not
+        included.
+        """
+        if out is None:
+            out = np.zeros(STATE_SIZE, dtype=np.int8)
+        out[:BOARD_CELLS] = self.state.reshape(-1)
+        for k, player in enumerate([1, -1]):
+            corners = out[CORNERS_AT + k * BOARD_CELLS:CORNERS_AT + (k + 1) * BOARD_CELLS]
+            corners[:] = 0
+            for (i, j) in self.corners[player]:
+                corners[i * self.size + j] = 1
+            start = PIECES_AT + k * len(All_Pieces)
+            out[start:start + len(All_Pieces)] = self.available_pieces(player)
+        out[ROUNDS_AT] = self.rounds
+        out[PLAYER_AT] = self.current_player
+        hashes = [self.hash] + [self.symmetric_hash.get(s, 0) for s in range(1, NUM_SYMMETRIES)]
+        out[HASH_AT:STATE_SIZE] = np.array(hashes, dtype=np.int64).view(np.int8)
+        return out
+
+    @classmethod
+    def from_array(cls, record):
+        """Rebuilds a game from a record written by to_array."""
+        game = cls()
+        game.state[:] = np.asarray(record[:BOARD_CELLS]).reshape(game.size, game.size)
+        for k, player in enumerate([1, -1]):
+            own = np.flatnonzero(game.state.reshape(-1) == player)
+            game.score[player] = len(own)
+            game.bitboards[player] = sum(1 << int(c) for c in own)
+            corners = record[CORNERS_AT + k * BOARD_CELLS:CORNERS_AT + (k + 1) * BOARD_CELLS]
+            game.corners[player] = set([divmod(int(c), game.size) for c in np.flatnonzero(corners)])
+            start = PIECES_AT + k * len(All_Pieces)
+            available = np.flatnonzero(record[start:start + len(All_Pieces)])
+            game.pieces[player] = sum(1 << int(piece) for piece in available)
+        game.rounds = int(record[ROUNDS_AT])
+        game.current_player = int(record[PLAYER_AT])
+        hashes = np.array(record[HASH_AT:STATE_SIZE]).view(np.int64)
+        game.hash = int(hashes[0])
+        game.symmetric_hash = {s: int(hashes[s]) for s in game.symmetric_hash}
+        for player in [1, -1]:
+            game.legal[player] = game.generate_legal_mask(player, opening=False)
+        return game
+
     def print_board(self):
         """prints current board"""
         print(self.state)
 
     def play_action(self, action):
         """given an action (numeric id), plays the action on the board"""
-        action = self.translate_action(action)
-        for (col, row) in action.points:
-            self.state[col, row] = self.current_player
-            self.score[self.current_player] += 1
+        table = get_table()
+        player = self.current_player
+        cells = table.cells[action, :table.size[action]]
+        self.state.flat[cells] = player
+        self.bitboards[player] |= get_masks()[action][0]
+        self.score[player] += len(cells)
+        self.hash ^= zobrist.PLACEMENT[player][table.placement[action]]
+        self.update_symmetric_hash(action, player)
 
         self.rounds += 1
-        self.corners[self.current_player].update(self.update_corners(action))
-        self.pieces[self.current_player] = self.remove_piece(action)
-        self.corners[-self.current_player] = set([(i, j) for (i, j) in self.corners[-self.current_player] if self.state[i][j] == 0])
+        new_corners = self.update_corners(table.corners[action])
+        added_corners = new_corners - self.corners[player]
+        self.corners[player].update(new_corners)
+        self.pieces[player] = self.remove_piece(table.piece[action])
+        opp_corners = self.corners[-player]
+        self.corners[-player] = set([(i, j) for (i, j) in opp_corners if self.state[i][j] == 0])
+        legal_changes = self.update_legal_moves(action, new_corners)
 
+        self.history.append((action, player, added_corners, opp_corners, legal_changes))
+        self.move_cache = {}
         self.current_player *= -1
 
+    def undo_action(self):
+        """
+        takes back the last action played with play_action, restoring the board, scores,
+        corners, pieces, legal moves, rounds and current player
+        """
+        action, player, added_corners, opp_corners, legal_changes = self.history.pop()
+        table = get_table()
+        self.state.flat[table.cells[action, :table.size[action]]] = 0
+        self.bitboards[player] &= ~get_masks()[action][0]
+        self.score[player] -= int(table.size[action])
+        self.hash ^= zobrist.PLACEMENT[player][table.placement[action]]
+        self.update_symmetric_hash(action, player)
+
+        self.rounds -= 1
+        self.corners[player].difference_update(added_corners)
+        self.pieces[player] |= 1 << int(table.piece[action])
+        # a copy, as clones share the undo records
+        self.corners[-player] = set(opp_corners)
+        dropped_own, dropped_opp, added = legal_changes
+        self.legal[player][added] = False
+        self.legal[player][dropped_own] = True
+        self.legal[-player][dropped_opp] = True
+
+        self.current_player = player
+        self.move_cache = {}
+
+    def position_key(self):
+        """
+        returns the zobrist key of the position: the placements of both players and the player
+        to move, independent of the order the placements were made in
+        """
+        if self.current_player == -1:
+            return self.hash ^ zobrist.SIDE
+        return self.hash
+
+    def child_key(self, action):
+        """returns the position_key after the current player plays action, without playing it"""
+        key = self.hash ^ zobrist.PLACEMENT[self.current_player][get_table().placement[action]]
+        if self.current_player == 1:
+            return key ^ zobrist.SIDE
+        return key
+
+    def update_symmetric_hash(self, action, player):
+        """xors the key of the image of a placement into each symmetric hash"""
+        placements = get_symmetries().placements
+        for s in self.symmetric_hash:
+            image_player = -player if SWAPS_COLOURS[s] else player
+            self.symmetric_hash[s] ^= zobrist.PLACEMENT[image_player][placements[s, action]]
+
+    def symmetric_key(self, symmetry, action=None):
+        """
+        returns the position_key of the image of the position under an exact symmetry, or of
+        the image of the position after the current player plays action
+        """
+        key = self.hash if symmetry == 0 else self.symmetric_hash[symmetry]
+        player = self.current_player
+        if action is not None:
+            image_player = -player if SWAPS_COLOURS[symmetry] else player
+            key ^= zobrist.PLACEMENT[image_player][get_symmetries().placements[symmetry, action]]
+            player = -player
+        if SWAPS_COLOURS[symmetry]:
+            player = -player
+        if player == -1:
+            return key ^ zobrist.SIDE
+        return key
+
+    def canonical_symmetry(self):
+        """
+        returns the exact symmetry mapping the position to its canonical form, the image with
+        the smallest key
+        """
+        return min(get_symmetries().exact, key=self.symmetric_key)
+
+    def canonical_key(self):
+        """returns the position_key of the canonical form, shared by all symmetric positions"""
+        return min(self.symmetric_key(s) for s in get_symmetries().exact)
+
+    def canonical_child_key(self, action):
+        """returns the canonical_key after the current player plays action, without playing it"""
+        return min(self.symmetric_key(s, action) for s in get_symmetries().exact)
+
+    def map_action(self, action, symmetry):
+        """
+        returns the image of an action id under a symmetry (-1 if no action covers the image
+        cells). Symmetries are their own inverses, so this also maps actions back.
+        """
+        return int(get_symmetries().actions[symmetry, action])
+
+    def transformed(self, symmetry):
+        """returns the image of the position under an exact symmetry, as a new game"""
+        cells = get_symmetries().cells[symmetry]
+        record = self.to_array()
+        image = record.copy()
+        image[cells] = record[:BOARD_CELLS]
+        players = [0, 1]
+        if SWAPS_COLOURS[symmetry]:
+            image[:BOARD_CELLS] *= -1
+            image[PLAYER_AT] *= -1
+            players = [1, 0]
+        for k, source in enumerate(players):
+            corners = record[CORNERS_AT + source * BOARD_CELLS:CORNERS_AT + (source + 1) * BOARD_CELLS]
+            image[CORNERS_AT + k * BOARD_CELLS + cells] = corners
+            pieces = record[PIECES_AT + source * len(All_Pieces):PIECES_AT + (source + 1) * len(All_Pieces)]
+            image[PIECES_AT + k * len(All_Pieces):PIECES_AT + (k + 1) * len(All_Pieces)] = pieces
+        # the image of the image under t is the image of the position under symmetry ^ t
+        hashes = record[HASH_AT:STATE_SIZE].view(np.int64)
+        image[HASH_AT:STATE_SIZE] = hashes[np.arange(NUM_SYMMETRIES) ^ symmetry].view(np.int8)
+        return BlokusGame.from_array(image)
+
+    def canonical_form(self):
+        """returns the canonical form of the position, as a new game"""
+        return self.transformed(self.canonical_symmetry())
+
     def heuristic(self, current_player):
         """returns the heuristic for the current player"""
         curr_corner = len(self.corners[current_player])
@@ -56,44 +274,110 @@ class BlokusGame(Game):
     def get_valid_moves(self, current_player):
         """returns a list of valid moves for the current player"""
         all_moves = np.zeros(self.action_size, dtype = np.int8)
-        list_of_legals = self.get_legal_moves(current_player)
-        for i in list_of_legals:
-            if i not in self.invalid_moves:
-                all_moves[i] = 1
+        list_of_legals = np.array(self.get_legal_moves(current_player), dtype=np.int64)
+        valid = list_of_legals[~get_table().invalid[list_of_legals]]
+        all_moves[valid] = 1
+        self.move_cache[current_player] = len(valid) > 0
+
+        return all_moves
+
+    def generate_valid_moves(self, current_player):
+        """
+        returns the same vector as get_valid_moves, computed from scratch for the whole board
+        with generate_legal_mask
+        """
+        all_moves = np.zeros(self.action_size, dtype = np.int8)
+        legal = np.flatnonzero(self.generate_legal_mask(current_player))
+        legal = np.array(self.unique_placements(current_player, legal), dtype=np.int64)
+        all_moves[legal[~get_table().invalid[legal]]] = 1
 
         return all_moves
 
     def check_game_over(self, current_player):
         """returns a boolean for whether the game is over and the winner of the game"""
-        moves = []
-        for player in [1, -1]:
-            moves.extend(self.get_valid_moves(player))
-            if sum(moves) > 0:
-                return False, 0
-
-        if sum(moves) > 0:
+        if self.has_any_move(1) or self.has_any_move(-1):
             return False, 0
         elif self.score[current_player] >= self.score[-current_player]:
             return True, 1
         else:
             return True, -1
 
+    def has_any_move(self, player_label):
+        """
+        returns whether the player has at least one valid move, stopping at the first one
+        found; the answer is cached until the position changes
+        """
+        if player_label not in self.move_cache:
+            self.move_cache[player_label] = self.find_move(player_label)
+        return self.move_cache[player_label]
+
+    def find_move(self, player_label):
+        """
+        looks for a valid move corner by corner. Only a move covering the same cells as
+        another one may be dropped by get_legal_moves, so those fall back to get_valid_moves.
+        """
+        table = get_table()
+        found_twin = False
+        for (i, j) in self.corners[player_label]:
+            base = (i * self.size + j) * 91
+            block = self.corner_moves(player_label, i, j)
+            if block.any():
+                if (block & ~table.twin[base:base + 91]).any():
+                    return True
+                found_twin = True
+        if found_twin:
+            return bool(self.get_valid_moves(player_label).any())
+        return False
+
+    def corner_moves(self, player_label, i, j):
+        """
+        returns the boolean mask of the 91 ids anchored on corner (i, j) that are legal and
+        not invalid. The legal move sets are only kept from the second round on; before,
+        the ids are checked one by one on the bitboards with valid_action.
+        """
+        table = get_table()
+        base = (i * self.size + j) * 91
+        if self.rounds >= 2:
+            legal = self.legal[player_label][base:base + 91]
+        else:
+            pieces = self.pieces[player_label]
+            legal = np.array([(pieces >> int(table.piece[a])) & 1 == 1 and self.valid_action(a, player_label)
+                              for a in range(base, base + 91)], dtype=bool)
+        return legal & ~table.invalid[base:base + 91]
+
+    def sample_move(self, player_label, attempts=8):
+        """
+        returns a valid move found by sampling: a random corner is drawn (without
+        replacement), then a random (piece, orientation) among the valid moves anchored on
+        it. Returns -1 when none of the first attempts corners has a move. Moves are not
+        drawn uniformly and may be any of the ids covering the same cells.
+        """
+        corners = list(self.corners[player_label])
+        for _ in range(min(attempts, len(corners))):
+            (i, j) = corners.pop(random.randrange(len(corners)))
+            base = (i * self.size + j) * 91
+            found = np.flatnonzero(self.corner_moves(player_label, i, j))
+            if len(found):
+                return base + int(found[random.randrange(len(found))])
+        return -1
+
     def remove_piece(self, piece):
         """
-        removes piece from the current player's pieces
+        removes piece (index in All_Pieces) from the current player's pieces
         """
-        new_pieces = [s for s in self.pieces[self.current_player] if s.ID != piece.ID]
-        return new_pieces   
+        return self.pieces[self.current_player] & ~(1 << int(piece))
+
+    def available_pieces(self, player_label):
+        """returns a boolean array telling which of All_Pieces the player can still place"""
+        return ((self.pieces[player_label] >> np.arange(len(All_Pieces))) & 1).astype(bool)
 
-    def update_corners(self, action):
+    def update_corners(self, corners):
         """
-        Updates the available corners of a player.
+        Updates the available corners of a player, given the flat corner cells of the placed
+        piece (-1 for corners off the board).
         """
-        new_corners = set()
-        for c in action.corners:
-            if (self.in_bounds(c) and (not self.overlap([c]))):
-                new_corners.add(c)
-        return new_corners
+        board = self.state.flat
+        return set([divmod(int(c), self.size) for c in corners if c >= 0 and board[c] == 0])
 
     def in_bounds(self, point):
         """
@@ -105,41 +389,19 @@ class BlokusGame(Game):
         """
         Returns a boolean for whether a move is overlapping any pieces that have already been placed on the board.
         """
-        if False in [(self.state[i][j] == 0) for (i, j) in move]:
-            return True
-        return False
+        return (points_mask(move) & (self.bitboards[1] | self.bitboards[-1])) != 0
 
     def corner(self, player_label, move):
         """
         returns a boolean of if a move is cornering any pieces of the player proposing the move
         """
-        corners = []
-        for (i, j) in move:
-            if self.in_bounds((i + 1, j + 1,)):
-                corners.append((self.state[i + 1][j + 1] == player_label))
-            if self.in_bounds((i - 1, j - 1)):
-                corners.append((self.state[i - 1][j - 1] == player_label))
-            if self.in_bounds((i + 1, j - 1,)):
-                corners.append((self.state[i + 1][j - 1] == player_label))
-            if self.in_bounds((i - 1, j + 1)):
-                corners.append((self.state[i - 1][j + 1] == player_label))
-        return True in corners
+        return (neighbour_mask(move, DIAGONAL) & self.bitboards[player_label]) != 0
     
     def adj(self, player_label, move):
         """
         returns a boolean of if a move is adjacent to any pieces of the player proposing the move
         """
-        adjacents = []
-        for (i, j) in move:
-            if self.in_bounds((i + 1, j)):
-                adjacents.append((self.state[i + 1][j] == player_label))
-            if self.in_bounds((i - 1, j)):
-                adjacents.append((self.state[i - 1][j] == player_label))
-            if self.in_bounds((i, j - 1)):
-                adjacents.append((self.state[i][j - 1] == player_label))
-            if self.in_bounds((i, j + 1)):
-                adjacents.append((self.state[i][j + 1] == player_label))
-        return True in adjacents
+        return (neighbour_mask(move, EDGE) & self.bitboards[player_label]) != 0
 
     def valid_move(self, action, player_label):
         if self.rounds < 2: # first actions haven't been done yet
@@ -156,131 +418,135 @@ class BlokusGame(Game):
             return False
         return True
 
+    def valid_action(self, action, player_label):
+        """
+        Same check as valid_move for a numeric action id of a piece anchored on one of the
+        player's corners, done with a few ANDs on the bitboards.
+        """
+        if not get_table().on_board[action]:
+            return False
+        cells, edges, corners = get_masks()[action]
+        if cells & (self.bitboards[1] | self.bitboards[-1]):
+            return False
+        if self.rounds < 2:
+            return True
+        own = self.bitboards[player_label]
+        return not (edges & own) and (corners & own) != 0
+
+    def update_legal_moves(self, action, new_corners):
+        """
+        Updates both players' legal move sets after the current player placed action: moves
+        covering the new cells are dropped for both players, the mover loses moves touching its
+        new cells along an edge and moves with the placed piece, and gains the moves anchored
+        on its new corners.
+
+        Returns the ids whose state changed as (dropped for the mover, dropped for the
+        opponent, added for the mover), for undo_action.
+        """
+        table = get_table()
+        player = self.current_player
+        legal = self.legal[player]
+        covered = np.concatenate([table.covering[c] for c in table.cells[action, :table.size[action]].tolist()])
+        touching = [table.covering[c] for c in table.edges[action].tolist() if c >= 0]
+        touching.append(table.piece_actions[table.piece[action]])
+        touching = np.concatenate([covered] + touching)
+        dropped_own = touching[legal[touching]]
+        dropped_opp = covered[self.legal[-player][covered]]
+        legal[dropped_own] = False
+        self.legal[-player][dropped_opp] = False
+
+        added = np.zeros(0, dtype=np.int64)
+        if not new_corners:
+            return dropped_own, dropped_opp, added
+        anchors = np.array([i * self.size + j for (i, j) in new_corners])
+        candidates = (anchors[:, None] * 91 + np.arange(91)).ravel()
+        candidates = candidates[table.on_board[candidates]]
+        candidates = candidates[self.available_pieces(player)[table.piece[candidates]]]
+
+        # index -1 (padding and cells off the board) reads the extra False at the end
+        occupied = np.append(self.state.flat != 0, False)
+        own = np.append(self.state.flat == player, False)
+        fits = ~occupied[table.cells[candidates]].any(axis=1)
+        fits &= ~own[table.edges[candidates]].any(axis=1)
+        fits &= own[table.corners[candidates]].any(axis=1)
+        added = candidates[fits & ~legal[candidates]]
+        legal[added] = True
+        return dropped_own, dropped_opp, added
+
+    def generate_legal_mask(self, player_label, opening=None):
+        """
+        Returns a boolean mask over all action ids of the moves anchored on the player's
+        corners, computed for every anchor of each of the 91 oriented shapes at once by
+        sliding the shape over three board masks: cells the player may cover, cells diagonal
+        to the player's pieces, and the player's corners. The first round rules apply when
+        opening is True, by default when fewer than two moves have been played.
+        """
+        table = get_table()
+        if opening is None:
+            opening = self.rounds < 2
+        n, pad = self.size, 4
+        own = self.state == player_label
+
+        def spread(mask, steps):
+            padded = np.zeros((n + 2, n + 2), dtype=bool)
+            for (di, dj) in steps:
+                padded[1 + di:n + 1 + di, 1 + dj:n + 1 + dj] |= mask
+            return padded[1:-1, 1:-1]
+
+        allowed = self.state == 0
+        if not opening:
+            allowed &= ~spread(own, [(1, 0), (-1, 0), (0, 1), (0, -1)])
+        anchors = np.zeros(n * n, dtype=bool)
+        for (i, j) in self.corners[player_label]:
+            anchors[i * n + j] = True
+
+        rows = table.shape_cells[:, :, 0] + pad
+        cols = table.shape_cells[:, :, 1] + pad
+        windows = sliding_window_view(np.pad(allowed, pad), (2 * pad + 1, 2 * pad + 1))
+        mask = windows[:, :, rows, cols].all(axis=3)
+        if not opening:
+            contact = spread(own, [(1, 1), (-1, -1), (1, -1), (-1, 1)]) & ~own
+            windows = sliding_window_view(np.pad(contact, pad), (2 * pad + 1, 2 * pad + 1))
+            mask &= windows[:, :, rows, cols].any(axis=3)
+
+        mask = mask.reshape(-1) & np.repeat(anchors, 91)
+        return mask & self.available_pieces(player_label)[table.piece]
+
     def get_legal_moves(self, player_label):
-        placements = []
-        visited = []
-        for cr in self.corners[player_label]:
-            for sh in self.pieces[player_label]:
-                try_out = deepcopy(sh)
-                try_out.create(0, cr)
-                for fl in try_out.flips:
-                    temp_fl = deepcopy(try_out)
-                    temp_fl.flip(fl)
-                    for rot in try_out.rots:
-                        temp_rot = deepcopy(temp_fl)
-                        temp_rot.rotate(rot)
-                        candidate = deepcopy(temp_rot)
-                        if fl == 'h':
-                            f = 1
-                        else:
-                            f = 0
-
-                        if candidate.ID not in ['I5', 'I4','I3','I2']:
-                            encoding = (cr[0] * 14 + cr[1]) * 91 + temp_rot.shift + (rot//90)*2 + f
-                        else:
-                            encoding = (cr[0] * 14 + cr[1]) * 91 + temp_rot.shift + (rot//90)*1 + f
-
-                        if self.valid_move(candidate.points, player_label):
-                            if not (set(candidate.points) in visited):
-                                placements.append(encoding) 
-                                visited.append(set(candidate.points))
-        return placements
+        if self.rounds >= 2:
+            return self.unique_placements(player_label, np.flatnonzero(self.legal[player_label]))
+        return self.unique_placements(player_label, np.flatnonzero(self.generate_legal_mask(player_label)))
+
+    def unique_placements(self, player_label, actions):
+        """
+        Drops the actions covering the same cells as another action in the list, keeping the
+        one with the lowest anchor, then the first in piece and orientation enumeration order.
+        """
+        table = get_table()
+        twins = actions[table.twin[actions]]
+        if len(twins) < 2:
+            return actions.tolist()
+        keys = table.placement[twins]
+        if len(np.unique(keys)) == len(keys):
+            return actions.tolist()
+
+        order = np.argsort(table.anchor[twins].astype(np.int64) * 91 + table.rank[twins], kind='stable')
+        first = np.unique(keys[order], return_index=True)[1]
+        dropped = np.setdiff1d(twins, twins[order][first])
+        return np.setdiff1d(actions, dropped).tolist()
 
     def translate_action(self, input_number):
+        """returns the action as a Piece placed on the board"""
+        table = get_table()
+        piece = copy(All_Pieces[table.piece[input_number]])
         position = input_number // 91
-        input_number = input_number % 91
-        if input_number < 8:
-            piece = All_Pieces[0]
-            rotation = input_number // 2
-            fl = input_number % 2
-        elif input_number < 16:
-            piece = All_Pieces[1]
-            rotation = (input_number % 8 )// 2
-            fl = input_number % 2
-        elif input_number < 24:
-            piece = All_Pieces[2]
-            rotation = (input_number % 8 )// 2
-            fl = input_number % 2
-        elif input_number < 32:
-            piece = All_Pieces[3]
-            rotation = (input_number % 8 )// 2
-            fl = input_number % 2    
-        elif input_number < 40:
-            piece = All_Pieces[4]
-            rotation = (input_number % 8 )// 2
-            fl = input_number % 2
-        elif input_number < 48:
-            piece = All_Pieces[5]
-            rotation = (input_number % 8 )// 2
-            fl = input_number % 2
-        elif input_number < 52:
-            piece = All_Pieces[6]
-            rotation = (input_number % 4 )// 2
-            fl = input_number % 2
-        elif input_number < 56:
-            piece = All_Pieces[7]
-            rotation = (input_number % 4 )// 2
-            fl = input_number % 2
-        elif input_number < 60:
-            piece = All_Pieces[8]
-            rotation = (input_number % 4 )// 2
-            fl = input_number % 2
-        elif input_number < 64:
-            piece = All_Pieces[9]
-            rotation = (input_number % 4 )// 2
-            fl = input_number % 2
-        elif input_number < 68:
-            piece = All_Pieces[10]
-            rotation = (input_number % 4 )// 2
-            fl = input_number % 2
-        elif input_number < 72:
-            piece = All_Pieces[11]
-            rotation = (input_number % 4 )// 2
-            fl = input_number % 2
-        elif input_number < 76:
-            piece = All_Pieces[12]
-            rotation = (input_number % 4 )// 2
-            fl = input_number % 2
-        elif input_number < 80:
-            piece = All_Pieces[13]
-            rotation = (input_number % 4 )// 2
-            fl = input_number % 2
-        elif input_number < 82:
-            piece = All_Pieces[14]
-            rotation = input_number % 2 
-            fl = 0
-        elif input_number < 84:
-            piece = All_Pieces[15]
-            rotation = input_number % 2 
-            fl = 0
-        elif input_number < 86:
-            piece = All_Pieces[16]
-            rotation = input_number % 2 
-            fl = 0
-        elif input_number < 88:
-            piece = All_Pieces[17]
-            rotation = 0 
-            fl = 0
-        elif input_number < 89:
-            piece = All_Pieces[18]
-            rotation = 0 
-            fl = 0
-        elif input_number < 90:
-            piece = All_Pieces[19]
-            rotation = 0 
-            fl = 0
-        elif input_number < 91:
-            piece = All_Pieces[20]
-            rotation = 0 
-            fl = 0
-
         position_x = int(position // 14)
         position_y = position % 14
-        if fl == 0: 
-            fl = "None" 
+        if table.flip[input_number] == 0:
+            fl = "None"
         else: fl = "h"
         piece.create(0, (position_x, position_y))
         piece.flip(fl)
-        piece.rotate(90 * rotation)
-        
-        return piece
\ No newline at end of file
+        piece.rotate(int(table.rotation[input_number]))
+
+        return piece
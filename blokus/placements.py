@@ -0,0 +1,183 @@
+"""Precomputed placement table for every action id of Blokus Duo."""
+from copy import deepcopy
+
+import numpy as np
+
+from blokus.piece import All_Pieces
+
+BOARD_SIZE = 14
+NUM_SHAPES = 91
+ACTION_SIZE = BOARD_SIZE * BOARD_SIZE * NUM_SHAPES
+
+MAX_CELLS = 5
+MAX_CORNERS = 8
+MAX_EDGES = 12
+
+EDGE_STEPS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+
+
+def shape_offset(piece, fl, rot):
+    """
+    Returns the offset (0-90) of an oriented piece inside the block of 91 ids of an anchor,
+    using the same encoding as BlokusGame.get_legal_moves.
+    """
+    f = 1 if fl == 'h' else 0
+    if piece.ID not in ['I5', 'I4', 'I3', 'I2']:
+        return piece.shift + (rot // 90) * 2 + f
+    return piece.shift + (rot // 90) * 1 + f
+
+
+def oriented_shapes():
+    """
+    Returns a list of the 91 oriented shapes indexed by their offset. Each entry is a tuple
+    (piece index, flip, rotation, enumeration rank, cells, corners) where cells and corners are
+    given relative to the anchor, which is always the first point of the piece.
+    """
+    shapes = [None] * NUM_SHAPES
+    rank = 0
+    for index, sh in enumerate(All_Pieces):
+        piece = deepcopy(sh)
+        piece.create(0, (0, 0))
+        for fl in piece.flips:
+            flipped = deepcopy(piece)
+            flipped.flip(fl)
+            for rot in piece.rots:
+                rotated = deepcopy(flipped)
+                rotated.rotate(rot)
+                shapes[shape_offset(piece, fl, rot)] = (index, fl, rot, rank,
+                                                        rotated.points, rotated.corners)
+                rank += 1
+    return shapes
+
+
+def compute_placements(invalid):
+    """
+    Computes the columns of the placement table from the pieces, given the boolean mask of
+    the invalid action ids. This is the slow part of building the table, done once by
+    blokus.tables when compiling the bundle.
+
+    Returns:
+        {column name: array}, the stored attributes of PlacementTable
+    """
+    n = BOARD_SIZE
+    shapes = oriented_shapes()
+    anchors = np.arange(n * n)
+    ax = np.repeat(anchors // n, NUM_SHAPES)
+    ay = np.repeat(anchors % n, NUM_SHAPES)
+
+    def place(offsets, width):
+        rel = np.zeros((NUM_SHAPES, width, 2), dtype=np.int16)
+        used = np.zeros((NUM_SHAPES, width), dtype=bool)
+        for o, points in enumerate(offsets):
+            rel[o, :len(points)] = points
+            used[o, :len(points)] = True
+        xs = ax[:, None] + np.tile(rel[:, :, 0], (n * n, 1))
+        ys = ay[:, None] + np.tile(rel[:, :, 1], (n * n, 1))
+        used = np.tile(used, (n * n, 1))
+        inside = (xs >= 0) & (xs < n) & (ys >= 0) & (ys < n)
+        flat = np.where(inside & used, xs * n + ys, -1).astype(np.int16)
+        return flat, used, inside
+
+    def neighbours(points, steps):
+        cells = set(points)
+        found = []
+        for (x, y) in points:
+            for (dx, dy) in steps:
+                p = (x + dx, y + dy)
+                if p not in cells and p not in found:
+                    found.append(p)
+        return found
+
+    edge_shapes = [neighbours(s[4], EDGE_STEPS) for s in shapes]
+
+    columns = {'invalid': np.asarray(invalid, dtype=bool)}
+    columns['cells'], used, inside = place([s[4] for s in shapes], MAX_CELLS)
+    columns['corners'] = place([s[5] for s in shapes], MAX_CORNERS)[0]
+    columns['edges'] = place(edge_shapes, MAX_EDGES)[0]
+    columns['on_board'] = np.all(inside | ~used, axis=1)
+
+    shape_cells = np.zeros((NUM_SHAPES, MAX_CELLS, 2), dtype=np.int16)
+    for o, s in enumerate(shapes):
+        shape_cells[o, :len(s[4])] = s[4]
+    columns['shape_cells'] = shape_cells
+
+    columns['piece'] = np.tile(np.array([s[0] for s in shapes], dtype=np.int8), n * n)
+    columns['size'] = np.tile(np.array([len(s[4]) for s in shapes], dtype=np.int8), n * n)
+    columns['flip'] = np.tile(np.array([s[1] == 'h' for s in shapes], dtype=np.int8), n * n)
+    columns['rotation'] = np.tile(np.array([s[2] for s in shapes], dtype=np.int16), n * n)
+    columns['rank'] = np.tile(np.array([s[3] for s in shapes], dtype=np.int8), n * n)
+    columns['anchor'] = (np.arange(ACTION_SIZE) // NUM_SHAPES).astype(np.int16)
+
+    # identical cell sets reached from different anchors or orientations
+    placement = np.arange(ACTION_SIZE, dtype=np.int32)
+    seen = {}
+    cells, size = columns['cells'], columns['size']
+    for a in np.flatnonzero(columns['on_board']):
+        key = frozenset(cells[a, :size[a]].tolist())
+        placement[a] = seen.setdefault(key, a)
+    columns['placement'] = placement
+    return columns
+
+
+class PlacementTable(object):
+    """
+    Geometry of every action id as flat NumPy arrays.
+
+    Board cells are stored as flat indices (row * 14 + column), -1 marks padding and cells
+    that fall off the board.
+
+    Attributes:
+        invalid (A): whether the action id is listed in invalid_moves.txt.
+        cells (A x 5): cells covered by the placement.
+        corners (A x 8): diagonal corner cells of the placement (the piece's corners), which
+                         are exactly the cells touching it only diagonally.
+        edges (A x 12): edge-neighbour cells of the placement.
+        piece (A): index of the piece in All_Pieces.
+        size (A): number of cells of the piece.
+        on_board (A): whether every cell of the placement is on the board.
+        anchor (A): flat index of the anchor cell (the corner the move was generated from).
+        rank (A): position of the oriented shape in get_legal_moves' enumeration order.
+        flip (A), rotation (A): orientation used to decode the id into a Piece.
+        placement (A): smallest action id covering exactly the same cells.
+        twin (A): whether some other action id covers exactly the same cells.
+        shape_cells (91 x 5 x 2): cells of each oriented shape relative to its anchor, padded
+                                  with the anchor itself.
+        covering (196 arrays): on-board action ids covering each cell.
+        piece_actions (21 arrays): action ids of each piece.
+
+    The stored columns (all but twin, covering and piece_actions) are read-only when they
+    come from the memory-mapped bundle.
+    """
+
+    COLUMNS = ('invalid', 'cells', 'corners', 'edges', 'on_board', 'shape_cells', 'piece',
+               'size', 'flip', 'rotation', 'rank', 'anchor', 'placement')
+
+    def __init__(self, columns):
+        n = BOARD_SIZE
+        for name in self.COLUMNS:
+            setattr(self, name, columns[name])
+
+        counts = np.bincount(self.placement, minlength=ACTION_SIZE)
+        self.twin = counts[self.placement] > 1
+
+        rows, cols = np.nonzero((self.cells >= 0) & self.on_board[:, None])
+        by_cell = np.argsort(self.cells[rows, cols], kind='stable')
+        bounds = np.searchsorted(self.cells[rows, cols][by_cell], np.arange(n * n + 1))
+        self.covering = [rows[by_cell[bounds[c]:bounds[c + 1]]] for c in range(n * n)]
+        self.piece_actions = [np.flatnonzero(self.piece == k) for k in range(len(All_Pieces))]
+
+    def points(self, action):
+        """returns the covered cells of an action as (row, column) tuples"""
+        return [divmod(int(c), BOARD_SIZE) for c in self.cells[action, :self.size[action]]]
+
+
+_table = None
+
+
+def get_table():
+    """returns the placement table, loading it from the move table bundle on first use"""
+    global _table
+    if _table is None:
+        from blokus.tables import get_bundle
+        _table = PlacementTable(get_bundle())
+    return _table
@@ -0,0 +1,103 @@
+"""Board symmetries of Blokus Duo and the mapping of action ids between symmetric positions."""
+import numpy as np
+
+from blokus.placements import ACTION_SIZE, BOARD_SIZE, get_table
+
+# symmetries that keep the starting points (4, 4) and (9, 9), indexed so that composing two
+# of them xors their indices: the 180 degree turns exchange the starting points, so they
+# also exchange the players' colours
+IDENTITY, TRANSPOSE, ROTATE, ANTI_TRANSPOSE = range(4)
+NUM_SYMMETRIES = 4
+SWAPS_COLOURS = (False, False, True, True)
+
+
+def transform_cell(symmetry, i, j):
+    """returns the image of cell (i, j) under a symmetry"""
+    last = BOARD_SIZE - 1
+    if symmetry & TRANSPOSE:
+        i, j = j, i
+    if symmetry & ROTATE:
+        i, j = last - i, last - j
+    return i, j
+
+
+def symmetry_cells(symmetry):
+    """returns the image of each flat cell under a symmetry"""
+    n = BOARD_SIZE
+    return np.array([i * n + j for i, j in (transform_cell(symmetry, *divmod(c, n)) for c in range(n * n))],
+                    dtype=np.int16)
+
+
+def compute_symmetries(table):
+    """
+    Computes the images of every action id of a PlacementTable under each symmetry, done
+    once by blokus.tables when compiling the bundle.
+
+    Returns:
+        (actions, placements), the stored attributes of SymmetryTable
+    """
+    by_cells = {}
+    on_board = np.flatnonzero(table.on_board)
+    for action in on_board.tolist():
+        by_cells.setdefault(frozenset(table.cells[action, :table.size[action]].tolist()), []).append(action)
+
+    actions = np.full((NUM_SYMMETRIES, ACTION_SIZE), -1, dtype=np.int32)
+    placements = np.full((NUM_SYMMETRIES, ACTION_SIZE), -1, dtype=np.int32)
+    for s in range(NUM_SYMMETRIES):
+        image_cells = symmetry_cells(s)
+        for action in on_board.tolist():
+            covering = by_cells.get(frozenset(image_cells[table.cells[action, :table.size[action]]].tolist()))
+            if covering is None:
+                continue
+            anchor = image_cells[table.anchor[action]]
+            same_anchor = [b for b in covering if table.anchor[b] == anchor]
+            actions[s, action] = (min(same_anchor, key=lambda b: table.rank[b]) if same_anchor
+                                  else table.placement[covering[0]])
+            placements[s, action] = table.placement[covering[0]]
+    return actions, placements
+
+
+class SymmetryTable(object):
+    """
+    Images of the board cells and action ids under each symmetry.
+
+    Attributes:
+        cells (4 x 196): image of each flat cell.
+        actions (4 x A): image of each action id: the id covering the image cells from the
+                         image of the anchor when there is one, else the table placement of
+                         the image cells, -1 for actions off the board and for images that
+                         no action id covers.
+        placements (4 x A): table placement (smallest id) of the image cells of each action,
+                            -1 as in actions.
+        exact (list): the symmetries mapping every on-board action to one with the same
+                      anchor. Legal move generation, and so the game, is invariant under
+                      these only: the piece orientations of All_Pieces do not cover every
+                      image of a rotated placement. invalid_moves.txt is not symmetric
+                      either (a few on-board ids are listed without their images), so
+                      a mapped move still has to be checked against the valid moves.
+    """
+
+    def __init__(self, columns):
+        table = get_table()
+        self.cells = np.array([symmetry_cells(s) for s in range(NUM_SYMMETRIES)])
+        self.actions = columns['symmetry_actions']
+        self.placements = columns['symmetry_placements']
+
+        on_board = np.flatnonzero(table.on_board)
+        self.exact = []
+        for s in range(NUM_SYMMETRIES):
+            images = self.actions[s, on_board]
+            if (images >= 0).all() and (table.anchor[images] == self.cells[s][table.anchor[on_board]]).all():
+                self.exact.append(s)
+
+
+_symmetries = None
+
+
+def get_symmetries():
+    """returns the symmetry table, loading it from the move table bundle on first use"""
+    global _symmetries
+    if _symmetries is None:
+        from blokus.tables import get_bundle
+        _symmetries = SymmetryTable(get_bundle())
+    return _symmetries
@@ -0,0 +1,102 @@
+"""Precompiled move tables of Blokus Duo, stored in one versioned binary bundle.
+
+The placement table (the decoding of every action id, built from the piece orientations),
+the invalid moves of invalid_moves.txt and the symmetry images of every action id are
+compiled into blokus/move_tables.npy, which is loaded memory-mapped so that processes share
+its pages instead of each rebuilding the tables. After changing the pieces, the action
+encoding or invalid_moves.txt, bump VERSION and rebuild the bundle:
+
+    python -m blokus.tables
+"""
+import os
+import warnings
+
+import numpy as np
+
+from blokus.placements import (ACTION_SIZE, MAX_CELLS, MAX_CORNERS, MAX_EDGES, NUM_SHAPES,
+                               PlacementTable, compute_placements)
+from blokus.symmetry import NUM_SYMMETRIES, compute_symmetries
+
+VERSION = 1
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+BUNDLE_PATH = os.path.join(PACKAGE_DIR, "move_tables.npy")
+INVALID_MOVES_PATH = os.path.join(os.path.dirname(PACKAGE_DIR), "invalid_moves.txt")
+
+# a single record whose fields are the table columns, so that each column is one contiguous
+# array of the file; wider types come first to keep every column aligned
+DTYPE = np.dtype([
+    ('version', '<i4'),
+    ('placement', '<i4', (ACTION_SIZE,)),
+    ('symmetry_actions', '<i4', (NUM_SYMMETRIES, ACTION_SIZE)),
+    ('symmetry_placements', '<i4', (NUM_SYMMETRIES, ACTION_SIZE)),
+    ('cells', '<i2', (ACTION_SIZE, MAX_CELLS)),
+    ('corners', '<i2', (ACTION_SIZE, MAX_CORNERS)),
+    ('edges', '<i2', (ACTION_SIZE, MAX_EDGES)),
+    ('shape_cells', '<i2', (NUM_SHAPES, MAX_CELLS, 2)),
+    ('rotation', '<i2', (ACTION_SIZE,)),
+    ('anchor', '<i2', (ACTION_SIZE,)),
+    ('piece', 'i1', (ACTION_SIZE,)),
+    ('size', 'i1', (ACTION_SIZE,)),
+    ('flip', 'i1', (ACTION_SIZE,)),
+    ('rank', 'i1', (ACTION_SIZE,)),
+    ('on_board', '?', (ACTION_SIZE,)),
+    ('invalid', '?', (ACTION_SIZE,)),
+])
+
+
+def read_invalid_moves(path=INVALID_MOVES_PATH):
+    """returns the boolean mask of the action ids listed in invalid_moves.txt"""
+    invalid = np.zeros(ACTION_SIZE, dtype=bool)
+    with open(path) as f:
+        invalid[[int(line) for line in f if line.strip()]] = True
+    return invalid
+
+
+def compile_bundle():
+    """computes the bundle record from the pieces and invalid_moves.txt"""
+    columns = compute_placements(read_invalid_moves())
+    columns['symmetry_actions'], columns['symmetry_placements'] = compute_symmetries(PlacementTable(columns))
+    bundle = np.zeros((), dtype=DTYPE)
+    bundle['version'] = VERSION
+    for name in DTYPE.names[1:]:
+        bundle[name] = columns[name]
+    return bundle
+
+
+def load_bundle(path=BUNDLE_PATH):
+    """
+    returns the memory-mapped bundle record of path, None if the file is missing or was
+    written by another version
+    """
+    if not os.path.exists(path):
+        return None
+    bundle = np.load(path, mmap_mode='r')
+    if bundle.dtype != DTYPE or bundle.shape != () or bundle['version'] != VERSION:
+        return None
+    return bundle
+
+
+_bundle = None
+
+
+def get_bundle():
+    """
+    Returns {column name: array} of the move tables, loading the bundle on first use. The
+    arrays are read-only views of the mapped file. Without an up to date bundle the tables
+    are compiled in memory, which takes a few seconds per process.
+    """
+    global _bundle
+    if _bundle is None:
+        bundle = load_bundle()
+        if bundle is None:
+            warnings.warn("%s is missing or out of date, compiling the move tables; "
+                          "run python -m blokus.tables to rebuild it" % BUNDLE_PATH)
+            bundle = compile_bundle()
+        _bundle = {name: np.asarray(bundle[name]) for name in DTYPE.names}
+    return _bundle
+
+
+if __name__ == '__main__':
+    np.save(BUNDLE_PATH, compile_bundle())
+    print("move tables version", VERSION, "written to", BUNDLE_PATH)
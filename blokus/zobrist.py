@@ -0,0 +1,17 @@
+"""Zobrist keys for Blokus Duo positions."""
+import numpy as np
+
+from blokus.placements import ACTION_SIZE
+
+SEED = 20230514
+
+_rng = np.random.default_rng(SEED)
+
+# one key per (player, placement): a position is the set of placements made by each player,
+# so positions reached in a different order share a key. Action ids covering the same cells
+# use the key of the table's placement id.
+PLACEMENT = {1: [int(k) for k in _rng.integers(1, 2 ** 63, ACTION_SIZE, dtype=np.int64)],
+            -1: [int(k) for k in _rng.integers(1, 2 ** 63, ACTION_SIZE, dtype=np.int64)]}
+
+# xored in when player -1 is to move
+SIDE = int(_rng.integers(1, 2 ** 63, dtype=np.int64))
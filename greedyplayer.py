@@ -1,10 +1,12 @@
 from random import choice
-from copy import deepcopy
 from blokus.blokus_game import BlokusGame
+from blokus.placements import get_table
 
 class GreedyPlayer:
-    def __init__(self, game: BlokusGame):
+    def __init__(self, game: BlokusGame, book=None):
         self.game = game
+        # opening book (openingbook.OpeningBook) whose moves are played while in book
+        self.book = book
     
     def move(self, move: int):
         self.game.play_action(move)
@@ -25,6 +27,10 @@ class GreedyPlayer:
 
     def choose_move(self, game: BlokusGame):
         """chooses the move with the highest payoff"""
+        if self.book is not None:
+            move = self.book.best_move(game)
+            if move != -1:
+                return move
         moves = self.get_moves(game)
         # print("moves", moves)
         if len(moves) == 0:
@@ -40,20 +46,20 @@ class GreedyPlayer:
     
 class GreedyCorner(GreedyPlayer):
     """a greedy agent that aims to maximize the number of corners"""
-    def __init__(self, game: BlokusGame):
-        super().__init__(game)
+    def __init__(self, game: BlokusGame, book=None):
+        super().__init__(game, book)
     
     def payoff(self, game, move):
         """returns the payoff of the move"""
         # print("checking move", move)
-        state = deepcopy(game)
-        current_player = state.current_player
-        current_corners = state.corners[current_player]
+        current_player = game.current_player
+        current_corners = game.corners[current_player]
         var1 = len(current_corners)
         # print("current corners", current_corners, var1)
-        state.play_action(move)
-        new_corners = state.corners[current_player]
+        game.play_action(move)
+        new_corners = game.corners[current_player]
         var2 = len(new_corners)
+        game.undo_action()
         # print("new corners", new_corners, var2)
         # print("BLAH", var2 - var1)
         return var2 - var1
@@ -63,33 +69,32 @@ class GreedyCornerDiff(GreedyPlayer):
     a greedy agent that aims to maximize the difference
     in number of corners between a player and their opponent
     """
-    def __init__(self, game: BlokusGame):
-        super().__init__(game)
+    def __init__(self, game: BlokusGame, book=None):
+        super().__init__(game, book)
 
     def payoff(self, game, move):
-        state = deepcopy(game)
-        current_player = state.current_player
+        current_player = game.current_player
         opp_player = current_player * -1
-        state.play_action(move)
-        curr_corner = len(state.corners[current_player])
-        opp_corner = len(state.corners[opp_player])
+        game.play_action(move)
+        curr_corner = len(game.corners[current_player])
+        opp_corner = len(game.corners[opp_player])
+        game.undo_action()
         return curr_corner - opp_corner
     
 class GreedyCombination(GreedyPlayer):
-    def __init__(self, game: BlokusGame):
-        super().__init__(game)
+    def __init__(self, game: BlokusGame, book=None):
+        super().__init__(game, book)
     
     def payoff(self, game, move):
-        state = deepcopy(game)
-        current_player = state.current_player
+        current_player = game.current_player
         opp_player = current_player * -1
-        state.play_action(move)
-        curr_corner = len(state.corners[current_player])
-        opp_corner = len(state.corners[opp_player])
+        game.play_action(move)
+        curr_corner = len(game.corners[current_player])
+        opp_corner = len(game.corners[opp_player])
+        game.undo_action()
         corner_difference = curr_corner - opp_corner
 
-        move_trans = state.translate_action(move)
-        move_size = move_trans.size
+        move_size = int(get_table().size[move])
 
         heuristic = corner_difference + 2 * move_size
         return heuristic
\ No newline at end of file
@@ -5,6 +5,7 @@ import os
 from blokus.blokus_game import BlokusGame
 # from neural_net import NeuralNetworkWrapper 
 from testing import Tester
+from tournament import AGENTS
 # from human_player import Human_player
 
 # Code to read command line arguments
@@ -15,6 +16,32 @@ parser.add_argument("--num_iterations",
                     dest="num_iterations",
                     type=int,
                     default=100)
+parser.add_argument("--player1",
+                    help="Agent moving first.",
+                    choices=sorted(AGENTS),
+                    default="random")
+parser.add_argument("--player2",
+                    help="Agent moving second.",
+                    choices=sorted(AGENTS),
+                    default="mcts")
+parser.add_argument("--time",
+                    help="Seconds per move of the MCTS agents.",
+                    type=float,
+                    default=12)
+parser.add_argument("--workers",
+                    help="Number of games played in parallel (default: one per CPU).",
+                    type=int,
+                    default=None)
+parser.add_argument("--seed",
+                    help="Seed of the first game, game i uses seed + i.",
+                    type=int,
+                    default=None)
+parser.add_argument("--book",
+                    help="Opening book file (see openingbook.py) used by the agents.",
+                    default=None)
+parser.add_argument("--output",
+                    help="Results file (default: results/<player1>_<player2>.txt).",
+                    default=None)
 
 if __name__ == '__main__':
     """Initializes game state, ne ural network and the training loop"""
@@ -26,4 +53,5 @@ if __name__ == '__main__':
     game = BlokusGame()
 
     tester = Tester(game)
-    tester.start(num_iterations)
\ No newline at end of file
+    tester.start(num_iterations, arguments.player1, arguments.player2, arguments.time,
+                 arguments.workers, arguments.seed, arguments.output, arguments.book)
\ No newline at end of file
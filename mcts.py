@@ -1,277 +1,872 @@
-from math import sqrt, log
-from copy import deepcopy
-from queue import Queue
+import os
+import random
+from collections import OrderedDict
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
 from random import choice
+from time import perf_counter
 from time import time as clock
 
-from blokus.blokus_game import BlokusGame
+import numpy as np
 
-class Node:
-    """Represents a board state and stores statistics for actions at that state.
+from blokus.batch import BatchGame
+from blokus.blokus_game import STATE_SIZE, BlokusGame
+
+# reward subtracted along a selected path while its rollout is pending, so the next
+# selections of a leaf-parallel batch prefer other paths
+VIRTUAL_LOSS = 100
+# share of the node and byte budgets a pruned tree is brought back to
+PRUNE_TARGET = 0.75
+
+class TranspositionTable:
+    """
+    Maps position keys (BlokusGame.position_key) to the statistics slot shared by every node
+    of that position. The table holds at most capacity entries; when it is full the least
+    recently used entry is replaced. Nodes keep the slot of a replaced entry, only new nodes
+    of that position start from fresh statistics.
+    """
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+
+    def lookup(self, key: int, tree: 'Tree') -> int:
+        """Returns the slot of a position, allocating one in tree if the position is not stored."""
+        slot = self.entries.get(key)
+        if slot is not None:
+            self.entries.move_to_end(key)
+            return slot
+        slot = tree.new_slot()
+        self.entries[key] = slot
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+        return slot
+
+    def remap(self, slots: np.ndarray) -> None:
+        """Renumbers the stored slots after Tree.subtree, dropping those mapped to -1."""
+        entries = OrderedDict()
+        for key, slot in self.entries.items():
+            if slot < len(slots) and slots[slot] >= 0:
+                entries[key] = int(slots[slot])
+        self.entries = entries
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class Tree:
+    """
+    Search tree stored as growable NumPy arrays indexed by integer node handles.
+
+    An expanded node owns a block of edges, one per valid move, stored in a random order in
+    the edge arrays from first_edge to first_edge + edge_count - 1. Child nodes are only
+    created when selection first picks an edge: the edges before first_edge + tried hold
+    children, the others are untried actions. Visit counts and rewards are kept per
+    statistics slot: every node has one, and nodes of the same position share it through
+    the transposition table.
 
     Attributes:
-        Nsa: An integer for visit count.
-        Q_RAVE (int): times this move has been critical in a rollout
-        N_RAVE (int): times this move has appeared in a rollout
-        Qsa: A float for the mean action value.
-        action: A tuple(row, column) of the prior move of reaching this node.
-        children: A list which stores child nodes.
-        parent: A TreeNode representing the parent node.
-        outcome (int): If node is a leaf, then outcome indicates
-                       the winner, else None
+        size (int): number of nodes
+        parent: handle of the parent node, -1 for the root
+        action: action played to reach the node from its parent, -1 for the root
+        first_edge, edge_count: the edge block of the node, edge_count is 0 for a leaf
+        tried: number of edges of the node that have a child
+        N_RAVE: all-moves-as-first visit count of the node's action, from its parent
+        Q_RAVE: all-moves-as-first total reward of the node's action, from its parent
+        slot: statistics slot of the node
+        edge_action: action of each edge
+        edge_child: child handle of each edge, -1 while the action is untried
+        N: visit count of each slot
+        Q: total reward (wins-losses) of each slot
     """
-    def __init__(self, parent=None, action=None):
-        """
-        Initialize a new node with optional move and parent and initially empty
-        children list and rollout statistics and unspecified outcome.
+    NODE_ARRAYS = (('parent', np.int32), ('action', np.int32), ('first_edge', np.int32),
+                   ('edge_count', np.int32), ('tried', np.int32), ('slot', np.int32),
+                   ('N_RAVE', np.int64), ('Q_RAVE', np.float64))
+    EDGE_ARRAYS = (('edge_action', np.int32), ('edge_child', np.int32))
+    SLOT_ARRAYS = (('N', np.int64), ('Q', np.float64))
+
+    def __init__(self, capacity: int = 1024, edge_capacity: int = None, slot_capacity: int = None,
+                 byte_limit: int = 0):
+        self.size = 0
+        self.edges = 0
+        self.slots = 0
+        # growth stops doubling the arrays past byte_limit allocated bytes (0 for no limit)
+        self.byte_limit = byte_limit
+        if byte_limit > 0 and edge_capacity is None and slot_capacity is None:
+            width = self._width(self.NODE_ARRAYS + self.EDGE_ARRAYS + self.SLOT_ARRAYS)
+            capacity = min(capacity, byte_limit // width)
+        for arrays, count in ((self.NODE_ARRAYS, capacity),
+                              (self.EDGE_ARRAYS, capacity if edge_capacity is None else edge_capacity),
+                              (self.SLOT_ARRAYS, capacity if slot_capacity is None else slot_capacity)):
+            for name, dtype in arrays:
+                setattr(self, name, np.zeros(count, dtype=dtype))
 
+    @staticmethod
+    def _width(arrays: tuple) -> int:
+        return sum(np.dtype(dtype).itemsize for _, dtype in arrays)
+
+    def _grow(self, arrays: tuple, needed: int) -> None:
+        length = len(getattr(self, arrays[0][0]))
+        capacity = 2 * length
+        if self.byte_limit > 0:
+            room = (self.byte_limit - self.allocated) // self._width(arrays)
+            capacity = min(capacity, length + max(room, 0))
+        capacity = max(needed, capacity)
+        for name, dtype in arrays:
+            grown = np.zeros(capacity, dtype=dtype)
+            old = getattr(self, name)
+            grown[:len(old)] = old
+            setattr(self, name, grown)
+
+    def new_slot(self) -> int:
+        """Allocates a statistics slot with no visits."""
+        if self.slots == len(self.N):
+            self._grow(self.SLOT_ARRAYS, self.slots + 1)
+        self.N[self.slots] = 0
+        self.Q[self.slots] = 0
+        self.slots += 1
+        return self.slots - 1
+
+    def add_node(self, parent: int, action: int, slot: int = None) -> int:
+        """
+        Appends a leaf with the given parent and action, and its own fresh statistics slot
+        unless one is given. Returns its handle.
         """
-        self.action = action
-        self.parent = parent
-        self.N = 0  # times this position was visited
-        self.Q = 0  # average reward (wins-losses) from this position
-        self.Q_RAVE = 0  # times this move has been critical in a rollout
-        self.N_RAVE = 0  # times this move has appeared in a rollout
-        self.children = {}
-        self.outcome = 0
-        self.expanded = 0
+        if self.size == len(self.parent):
+            self._grow(self.NODE_ARRAYS, self.size + 1)
+        node = self.size
+        self.parent[node] = parent
+        self.action[node] = action
+        self.first_edge[node] = 0
+        self.edge_count[node] = 0
+        self.tried[node] = 0
+        self.slot[node] = self.new_slot() if slot is None else slot
+        self.N_RAVE[node] = 0
+        self.Q_RAVE[node] = 0
+        self.size += 1
+        return node
+
+    def add_edges(self, node: int, actions) -> None:
+        """Expands a leaf with an edge block for the given (already shuffled) actions."""
+        count = len(actions)
+        if self.edges + count > len(self.edge_action):
+            self._grow(self.EDGE_ARRAYS, self.edges + count)
+        block = slice(self.edges, self.edges + count)
+        self.edge_action[block] = actions
+        self.edge_child[block] = -1
+        self.first_edge[node] = self.edges
+        self.edge_count[node] = count
+        self.tried[node] = 0
+        self.edges += count
 
-    def is_not_leaf(self):
-        """Checks if a TreeNode is a leaf.
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the nodes, edges and slots in use (not the allocated capacity)."""
+        return (self.size * self._width(self.NODE_ARRAYS) + self.edges * self._width(self.EDGE_ARRAYS)
+                + self.slots * self._width(self.SLOT_ARRAYS))
 
-        Returns:
-            A boolean value indicating if a TreeNode is a leaf.
+    @property
+    def allocated(self) -> int:
+        """Bytes allocated for the tree arrays, used or not."""
+        return (len(self.parent) * self._width(self.NODE_ARRAYS)
+                + len(self.edge_action) * self._width(self.EDGE_ARRAYS)
+                + len(self.N) * self._width(self.SLOT_ARRAYS))
+
+    def depths(self) -> np.ndarray:
+        """Returns the depth of every node below the root (handle of parent -1)."""
+        parent = self.parent[:self.size]
+        depth = np.zeros(self.size, dtype=np.int64)
+        has_parent = parent >= 0
+        # each pass settles one more level of the tree
+        while True:
+            updated = np.where(has_parent, depth[parent] + 1, 0)
+            if (updated == depth).all():
+                return depth
+            depth = updated
+
+    def subtree_sizes(self) -> np.ndarray:
+        """Returns the number of nodes in the subtree of every node, itself included."""
+        depth = self.depths()
+        sizes = np.ones(self.size, dtype=np.int64)
+        for level in range(int(depth.max(initial=0)), 0, -1):
+            nodes = np.flatnonzero(depth == level)
+            np.add.at(sizes, self.parent[nodes], sizes[nodes])
+        return sizes
+
+    def collapse(self, nodes) -> None:
         """
-        if len(self.children) > 0:
-            return True
-        return False
+        Turns nodes back into leaves that keep their own statistics. Their children become
+        unreachable and are dropped by the next subtree.
+        """
+        self.edge_count[nodes] = 0
+        self.tried[nodes] = 0
 
-    def expand_node(self, game):
-        """Expands the current node by adding valid moves as children.
+    def is_leaf(self, node: int) -> bool:
+        return self.edge_count[node] == 0
 
-        Args:
-            game: An object containing the game state.
-        """
-        # self.child_psas = deepcopy(psa_vector)
-        
-        valid_moves = game.get_valid_moves(game.current_player)
-        if valid_moves is None:
-            return False
-        # print("expand node", sum(valid_moves))
-        for idx, move in enumerate(valid_moves):
-            if move == 1:
-                action = idx
-                self.add_child_node(action=action)
-        return True
-                
-    def add_child_node(self, action, psa=0.0):
-        """Creates and adds a child Node to the current node.
+    def next_untried(self, node: int) -> int:
+        """Returns the action of the next untried edge of node, -1 when all were tried."""
+        if self.tried[node] == self.edge_count[node]:
+            return -1
+        return int(self.edge_action[self.first_edge[node] + self.tried[node]])
 
-        Args:
-            parent: A Node which is the parent of this node.
-            action: A tuple(row, column) of the prior move to reach this node.
-        Returns:
-            The newly created child Node.
-        """
-        self.expanded += 1
-        child_node = Node(parent=self, action=action)
-        self.children[child_node.action] = child_node
-        return child_node
+    def add_child(self, node: int, slot: int = None) -> int:
+        """Creates the child of the next untried edge of node and returns its handle."""
+        edge = self.first_edge[node] + self.tried[node]
+        child = self.add_node(node, self.edge_action[edge], slot)
+        self.edge_child[edge] = child
+        self.tried[node] += 1
+        return child
 
-    @property
-    def value(self, explore: float = 0.5):
+    def children(self, node: int) -> np.ndarray:
+        """Returns the handles of the children created so far for a node."""
+        first = self.first_edge[node]
+        return self.edge_child[first:first + self.tried[node]]
+
+    def visits(self, node: int) -> int:
+        return self.N[self.slot[node]]
+
+    def reward(self, node: int) -> float:
+        return self.Q[self.slot[node]]
+
+    def uct_values(self, node: int, explore: float, rave_equivalence: float = 0) -> tuple:
         """
-        Calculate the UCT value of this node relative to its parent, the parameter
-        "explore" specifies how much the value should favor nodes that have
+        Calculate the UCT values of all the children of a node at once, the parameter
+        "explore" specifies how much the values should favor nodes that have
         yet to be thoroughly explored versus nodes that seem to have a high win
         rate.
-        Currently explore is set to 0.5.
 
+        With a positive rave_equivalence k, the win rate of a child is blended with its
+        all-moves-as-first win rate using the weight beta = sqrt(k / (3 N + k)), so RAVE
+        dominates while a child has few visits and fades out after about k visits.
+
+        Returns:
+            The children handles and their values, as two arrays.
         """
-        # if the node is not visited, set the value as infinity. Nodes with no visits are on priority
-        # (lambda: print("a"), lambda: print("b"))[test==true]()
-        if self.N == 0:
-            return 0 if explore == 0 else float('inf')
-        else:
-            return self.Q / self.N + explore * sqrt(2 * log(self.parent.N) / self.N)  # exploitation + exploration
+        children = self.children(node)
+        slots = self.slot[children]
+        n = self.N[slots]
+        parent_n = self.visits(node)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            win_rate = self.Q[slots] / n
+            if rave_equivalence > 0:
+                n_rave = self.N_RAVE[children]
+                beta = np.where(n_rave > 0, np.sqrt(rave_equivalence / (3 * n + rave_equivalence)), 0)
+                win_rate = (1 - beta) * win_rate + beta * self.Q_RAVE[children] / np.maximum(n_rave, 1)
+            values = win_rate + explore * np.sqrt(2 * np.log(parent_n) / n)  # exploitation + exploration
+        # nodes with no visits are on priority, unless there is no exploration at all
+        values[n == 0] = 0 if explore == 0 else np.inf
+        return children, values
+
+    def subtree(self, root: int) -> tuple:
+        """
+        Returns a new Tree holding only the subtree of root (which becomes handle 0) and
+        the mapping of old slots to new ones (-1 for dropped slots). The new arrays are
+        allocated to the size of the subtree, and grow again as nodes are added.
+        """
+        order = [root]
+        i = 0
+        while i < len(order):
+            order.extend(self.children(order[i]).tolist())
+            i += 1
+        order = np.array(order, dtype=np.int64)
+
+        new_handle = np.full(self.size + 1, -1, dtype=np.int64)  # index -1 maps to -1
+        new_handle[order] = np.arange(len(order))
+        slots = np.full(self.slots, -1, dtype=np.int64)
+        kept = np.unique(self.slot[order])
+        slots[kept] = np.arange(len(kept))
+
+        counts = self.edge_count[order]
+        edge_order = np.concatenate([np.arange(self.first_edge[node], self.first_edge[node] + count)
+                                     for node, count in zip(order, counts)] + [np.zeros(0, dtype=np.int64)])
+
+        tree = Tree(len(order), len(edge_order), len(kept), self.byte_limit)
+        tree.size = len(order)
+        tree.parent[:tree.size] = np.where(order == root, -1, new_handle[self.parent[order]])
+        tree.action[:tree.size] = self.action[order]
+        tree.first_edge[:tree.size] = np.cumsum(counts) - counts
+        tree.edge_count[:tree.size] = counts
+        tree.tried[:tree.size] = self.tried[order]
+        tree.slot[:tree.size] = slots[self.slot[order]]
+        tree.N_RAVE[:tree.size] = self.N_RAVE[order]
+        tree.Q_RAVE[:tree.size] = self.Q_RAVE[order]
+        tree.edges = len(edge_order)
+        tree.edge_action[:tree.edges] = self.edge_action[edge_order]
+        tree.edge_child[:tree.edges] = new_handle[self.edge_child[edge_order]]
+        tree.slots = len(kept)
+        tree.N[:tree.slots] = self.N[kept]
+        tree.Q[:tree.slots] = self.Q[kept]
+        return tree, slots
+
+
+class SearchStats:
+    """
+    Record of one call to MonteCarloTreeSearch.search.
+
+    Attributes:
+        rollouts (int): number of simulations
+        rollout_moves (int): moves played by all the simulations
+        run_time (float): wall-clock duration of the search in seconds
+        selection_time, expansion_time, rollout_time, backup_time (float): seconds spent in
+            each phase; with worker processes these are summed over the workers, and a
+            leaf-parallel search counts the wall-clock time of its rollout batches
+        tree_size (int): nodes in the tree after the search
+        max_depth (int): depth of the deepest node below the root
+        root_visits (dict): visit count of each child of the root, by action
+        pruned_nodes (int): nodes dropped to keep the tree within its budget
+    """
+
+    def __init__(self):
+        self.rollouts = 0
+        self.rollout_moves = 0
+        self.run_time = 0.0
+        self.selection_time = 0.0
+        self.expansion_time = 0.0
+        self.rollout_time = 0.0
+        self.backup_time = 0.0
+        self.tree_size = 0
+        self.max_depth = 0
+        self.root_visits = {}
+        self.pruned_nodes = 0
+
+    @property
+    def rollouts_per_second(self) -> float:
+        return self.rollouts / self.run_time if self.run_time > 0 else 0.0
+
+    @property
+    def average_rollout_depth(self) -> float:
+        return self.rollout_moves / self.rollouts if self.rollouts > 0 else 0.0
+
+    def add(self, other: 'SearchStats') -> None:
+        """Adds the counters and phase times of another search (of a worker) to this one."""
+        self.rollouts += other.rollouts
+        self.rollout_moves += other.rollout_moves
+        self.selection_time += other.selection_time
+        self.expansion_time += other.expansion_time
+        self.rollout_time += other.rollout_time
+        self.backup_time += other.backup_time
+        self.pruned_nodes += other.pruned_nodes
+        self.max_depth = max(self.max_depth, other.max_depth)
+
+    def as_dict(self) -> dict:
+        return {'rollouts': self.rollouts, 'rollouts_per_second': self.rollouts_per_second,
+                'average_rollout_depth': self.average_rollout_depth, 'run_time': self.run_time,
+                'selection_time': self.selection_time, 'expansion_time': self.expansion_time,
+                'rollout_time': self.rollout_time, 'backup_time': self.backup_time,
+                'tree_size': self.tree_size, 'max_depth': self.max_depth,
+                'pruned_nodes': self.pruned_nodes, 'root_visits': dict(self.root_visits)}
+
+    def __repr__(self) -> str:
+        return ('SearchStats(%d rollouts in %.2fs, %.1f/s, depth %.1f, tree %d, max depth %d, '
+                'select %.2fs, expand %.2fs, rollout %.2fs, backup %.2fs)'
+                % (self.rollouts, self.run_time, self.rollouts_per_second, self.average_rollout_depth,
+                   self.tree_size, self.max_depth, self.selection_time, self.expansion_time,
+                   self.rollout_time, self.backup_time))
+
+
+def root_search(args: tuple) -> tuple:
+    """
+    Runs one independent search in a worker process of a root-parallel search.
+
+    Args:
+        args: (game, time_budget, iterations, seed, options) where options are the keyword
+              arguments of the worker's MonteCarloTreeSearch
+
+    Returns:
+        The root visit count, a dict {action: (N, Q)} of the root's children and the
+        SearchStats of the worker.
+    """
+    game, time_budget, iterations, seed, options = args
+    random.seed(seed)
+    np.random.seed(seed % 2 ** 32)
+    mcts = MonteCarloTreeSearch(game, **options)
+    stats = mcts.search(time_budget, iterations)
+    tree = mcts.tree
+    return tree.visits(mcts.root), {int(tree.action[child]): (int(tree.visits(child)), float(tree.reward(child)))
+                                    for child in tree.children(mcts.root)}, stats
+
+
+_leaf_memory = None
+_leaf_states = None
+_light_rollouts = False
+
+
+def init_rollout_worker(name: str, batch: int, seed: int, light: bool) -> None:
+    """Attaches a rollout worker process to the shared buffer of leaf states."""
+    global _leaf_memory, _leaf_states, _light_rollouts
+    _leaf_memory = SharedMemory(name=name)
+    _leaf_states = np.ndarray((batch, STATE_SIZE), dtype=np.int8, buffer=_leaf_memory.buf)
+    _light_rollouts = light
+    random.seed(seed ^ os.getpid())
+
+
+def rollout_row(row: int) -> tuple:
+    """Rolls out the leaf state stored in a row of the shared buffer."""
+    return MonteCarloTreeSearch.roll_out(BlokusGame.from_array(_leaf_states[row]), _light_rollouts)
+
 
 class MonteCarloTreeSearch:
     """
     Basic no frills implementation of an agent that preforms MCTS for hex.
     Attributes:
         game: An object containing the game state.
-        root (Node): Root of the tree search
+        tree (Tree): array storage of the search tree
+        root (int): handle of the root of the tree search
         run_time (int): time per each run
         node_count (int): the whole nodes in tree
         num_rollouts (int): The number of rollouts for each search
-        EXPLORATION (int): specifies how much the value should favor
-                           nodes that have yet to be thoroughly explored versus nodes
-                           that seem to have a high win rate.
+        exploration (float): specifies how much the UCT value should favor
+                             nodes that have yet to be thoroughly explored versus nodes
+                             that seem to have a high win rate.
+        rave_equivalence (float): number of visits after which a child's own statistics
+                                  weigh as much as its RAVE (all-moves-as-first) statistics
+                                  in selection, 0 disables RAVE
+        light_rollouts (bool): pick rollout moves by sampling (BlokusGame.sample_move)
+                               instead of generating every valid move
+        max_nodes (int): node budget of the tree, 0 for no limit
+        max_bytes (int): memory budget of the tree arrays as allocated (Tree.allocated), 0
+                         for no limit; the arrays stop doubling at the budget and over
+                         budget the tree is pruned, see prune
+        book (openingbook.OpeningBook): opening book; in book positions the search is
+                                        skipped and best_move plays the book move
+        symmetry (bool): key the transposition table by BlokusGame.canonical_key, so that
+                         symmetric positions share their statistics
+        transpositions (TranspositionTable): statistics shared between nodes of the same
+                                             position, None when transposition_size is 0
+        workers (int): number of worker processes searching in parallel from the root,
+                       1 searches in this process
+        leaf_workers (int): number of worker processes running the rollouts of a single
+                            tree, 0 runs them in this process
+        leaf_batch (int): leaves selected per iteration of a leaf-parallel search; without
+                          leaf_workers the batch is rolled out in this process, all the
+                          leaves at once with BatchGame.roll_out
     """
 
-    def __init__(self, game: BlokusGame):
+    def __init__(self, game: BlokusGame, transposition_size: int = 100000, workers: int = 1,
+                 leaf_workers: int = 0, leaf_batch: int = 0, exploration: float = 0.5,
+                 rave_equivalence: float = 0, light_rollouts: bool = False, max_nodes: int = 0,
+                 max_bytes: int = 0, book=None, symmetry: bool = False):
         self.game = game
-        self.root = Node()
+        self.symmetry = symmetry
+        self.book = book
+        self.max_nodes = max_nodes
+        self.max_bytes = max_bytes
+        self.light_rollouts = light_rollouts
+        self.exploration = exploration
+        self.rave_equivalence = rave_equivalence
+        self.workers = workers
+        self.pool = None
+        self.leaf_workers = leaf_workers
+        self.leaf_batch = leaf_batch or 2 * leaf_workers
+        self.rollout_pool = None
+        self.leaf_memory = None
+        self.leaf_states = None
+        self.transposition_size = transposition_size
+        self.transpositions = None
+        if transposition_size > 0:
+            self.transpositions = TranspositionTable(transposition_size)
+        self.new_root()
         self.run_time = 0
         self.node_count = 0
         self.num_rollouts = 0
+        self.stats = SearchStats()
 
-    def search(self, time_budget: int) -> None:
+    def search(self, time_budget: float = None, iterations: int = None) -> SearchStats:
         """
         Search and update the search tree for a
-        specified amount of time in seconds.
+        specified amount of time in seconds, or a fixed number of iterations
+        (rollouts), whichever ends first. At least one of the two must be given.
+
+        Returns:
+            The SearchStats of this search, also kept in self.stats.
         """
+        if time_budget is None and iterations is None:
+            raise ValueError("search needs a time_budget or a number of iterations")
+        self.stats = SearchStats()
+        start_time = clock()
+        if self.book_move() != -1:
+            pass
+        elif self.workers > 1:
+            self.parallel_search(time_budget, iterations)
+        elif self.leaf_batch > 0:
+            self.leaf_parallel_search(time_budget, iterations)
+        else:
+            self.serial_search(time_budget, iterations)
+        return self.finish_stats(clock() - start_time)
+
+    @staticmethod
+    def within_budget(start_time: float, time_budget: float, iterations: int, done: int) -> bool:
+        if iterations is not None and done >= iterations:
+            return False
+        return time_budget is None or clock() - start_time < time_budget
+
+    def serial_search(self, time_budget: float, iterations: int) -> None:
+        """Runs the select, roll out and backup loop in this process."""
+        stats = self.stats
         start_time = clock()
-        num_rollouts = 0
 
         # do until we exceed our time budget
-        while clock() - start_time < time_budget:
+        while self.within_budget(start_time, time_budget, iterations, stats.rollouts):
             # print("rollouts: ", num_rollouts)
             # print(clock() - start_time)
+            t0 = perf_counter()
             node, state = self.select_node()
+            t1 = perf_counter()
             turn = state.current_player * -1
-            outcome = self.roll_out(state)
+            outcome, actions = self.roll_out(state, self.light_rollouts)
             # print("outcome", outcome)
-            self.backup(node, turn, outcome)
-            num_rollouts += 1
-        # run_time = clock() - start_time
-        # node_count = self.tree_size()
-        # self.run_time = run_time
-        # self.node_count = node_count
-        # self.num_rollouts = num_rollouts
+            t2 = perf_counter()
+            self.backup(node, turn, outcome, actions)
+            t3 = perf_counter()
+            # select_node adds its expansion time to the stats itself
+            stats.selection_time += t1 - t0
+            stats.rollout_time += t2 - t1
+            stats.backup_time += t3 - t2
+            stats.rollouts += 1
+            stats.rollout_moves += len(actions)
+            if self.over_budget():
+                self.prune()
+        stats.selection_time -= stats.expansion_time
+
+    def finish_stats(self, run_time: float) -> SearchStats:
+        """Completes self.stats with the run time and the shape of the tree after a search."""
+        stats = self.stats
+        tree = self.tree
+        stats.run_time = run_time
+        stats.tree_size = tree.size
+        stats.max_depth = max(stats.max_depth, self.tree_depth())
+        stats.root_visits = {int(tree.action[child]): int(tree.visits(child))
+                             for child in tree.children(self.root)}
+        self.run_time = run_time
+        self.node_count = stats.tree_size
+        self.num_rollouts = stats.rollouts
+        return stats
+
+    def tree_depth(self) -> int:
+        """Returns the depth of the deepest node of the tree below the root."""
+        return int(self.tree.depths().max(initial=0))
+
+    def over_budget(self, share: float = 1.0) -> bool:
+        """Whether the tree uses more than share of its node or byte budget."""
+        return ((self.max_nodes > 0 and self.tree.size > share * self.max_nodes)
+                or (self.max_bytes > 0 and self.tree.allocated > share * self.max_bytes))
+
+    def prune(self) -> None:
+        """
+        Brings the tree back under PRUNE_TARGET of its budget by collapsing the least
+        visited expanded nodes into leaves, then compacting the tree to the nodes still
+        reachable from the root. Collapsed nodes keep their statistics and are expanded
+        again if selection comes back to them.
+        """
+        while self.over_budget(PRUNE_TARGET):
+            tree = self.tree
+            # compacting alone frees the unused capacity, collapsing the entries in use
+            usage = max(tree.size / self.max_nodes if self.max_nodes > 0 else 0,
+                        tree.nbytes / self.max_bytes if self.max_bytes > 0 else 0)
+            if usage > PRUNE_TARGET:
+                excess = tree.size * (1 - PRUNE_TARGET / usage)
+                expanded = np.flatnonzero(tree.edge_count[:tree.size] > 0)
+                expanded = expanded[expanded != self.root]
+                if len(expanded) == 0:
+                    return
+                order = expanded[np.argsort(tree.N[tree.slot[expanded]], kind='stable')]
+                # the subtree of a collapsed node is dropped, itself excepted
+                dropped = np.cumsum(tree.subtree_sizes()[order] - 1)
+                tree.collapse(order[:np.searchsorted(dropped, excess) + 1])
+
+            size = tree.size
+            self.tree, slots = tree.subtree(self.root)
+            self.root = 0
+            if self.transpositions is not None:
+                self.transpositions.remap(slots)
+            self.stats.pruned_nodes += size - self.tree.size
+
+    def parallel_search(self, time_budget: float, iterations: int = None) -> None:
+        """
+        Root-parallel search: every worker process runs an independent search from the
+        current position with its own random seed for time_budget seconds, the iterations
+        being split between the workers. The visit counts
+        and rewards of the root's children are then summed over the workers, and the tree is
+        replaced by a root holding the merged statistics, which best_move and move use as usual.
+        """
+        if self.pool is None:
+            self.pool = Pool(self.workers)
+        state = self.game.clone()
+        state.history = []  # workers never undo past the root
+        seed = random.getrandbits(32)
+        options = dict(transposition_size=self.transposition_size, exploration=self.exploration,
+                       rave_equivalence=self.rave_equivalence, light_rollouts=self.light_rollouts,
+                       max_nodes=self.max_nodes, max_bytes=self.max_bytes, symmetry=self.symmetry)
+        shares = [None] * self.workers
+        if iterations is not None:
+            shares = [iterations // self.workers + (k < iterations % self.workers) for k in range(self.workers)]
+        jobs = [(state, time_budget, shares[k], seed + k, options) for k in range(self.workers)]
+
+        root_visits = 0
+        merged = {}
+        for visits, children, stats in self.pool.map(root_search, jobs):
+            self.stats.add(stats)
+            root_visits += visits
+            for action, (n, q) in children.items():
+                total = merged.setdefault(action, [0, 0])
+                total[0] += n
+                total[1] += q
+
+        self.new_root()
+        tree = self.tree
+        tree.N[tree.slot[self.root]] = root_visits
+        tree.add_edges(self.root, list(merged))
+        for action in merged:
+            child = tree.add_child(self.root)
+            tree.N[tree.slot[child]], tree.Q[tree.slot[child]] = merged[action]
+
+    def leaf_parallel_search(self, time_budget: float, iterations: int = None) -> None:
+        """
+        Leaf-parallel search: each iteration selects leaf_batch leaves, applying a virtual
+        loss along every selected path so that the following selections diverge, and has
+        the rollout workers simulate them. Leaf states are handed over as rows of a shared
+        memory buffer (BlokusGame.to_array) rather than pickled games. Without rollout
+        workers the leaves are simulated together in this process by BatchGame.roll_out.
+        """
+        if self.rollout_pool is None and self.leaf_workers > 0:
+            self.leaf_memory = SharedMemory(create=True, size=self.leaf_batch * STATE_SIZE)
+            self.leaf_states = np.ndarray((self.leaf_batch, STATE_SIZE), dtype=np.int8,
+                                          buffer=self.leaf_memory.buf)
+            self.rollout_pool = Pool(self.leaf_workers, initializer=init_rollout_worker,
+                                     initargs=(self.leaf_memory.name, self.leaf_batch,
+                                               random.getrandbits(32), self.light_rollouts))
+        stats = self.stats
+        start_time = clock()
+
+        while self.within_budget(start_time, time_budget, iterations, stats.rollouts):
+            batch = self.leaf_batch
+            if iterations is not None:
+                batch = min(batch, iterations - stats.rollouts)
+            t0 = perf_counter()
+            leaves = []
+            states = []
+            for row in range(batch):
+                node, state = self.select_node()
+                self.add_virtual_loss(node, 1)
+                if self.rollout_pool is not None:
+                    state.to_array(out=self.leaf_states[row])
+                else:
+                    states.append(state)
+                leaves.append((node, state.current_player * -1))
+            t1 = perf_counter()
+            if self.rollout_pool is not None:
+                outcomes = self.rollout_pool.map(rollout_row, range(len(leaves)))
+            else:
+                rollouts = BatchGame.from_games(states, np.random.randint(2 ** 32)).roll_out()
+                outcomes = zip(rollouts[0].tolist(), rollouts[1])
+            t2 = perf_counter()
+            for (node, turn), (outcome, actions) in zip(leaves, outcomes):
+                self.add_virtual_loss(node, -1)
+                self.backup(node, turn, outcome, actions)
+                stats.rollout_moves += len(actions)
+            stats.selection_time += t1 - t0
+            stats.rollout_time += t2 - t1
+            stats.backup_time += perf_counter() - t2
+            stats.rollouts += len(leaves)
+            if self.over_budget():
+                self.prune()
+        stats.selection_time -= stats.expansion_time
+
+    def add_virtual_loss(self, node: int, sign: int) -> None:
+        """Adds (sign 1) or removes (sign -1) a virtual loss on the path from node to root."""
+        tree = self.tree
+        while node != -1:
+            tree.N[tree.slot[node]] += sign
+            tree.Q[tree.slot[node]] -= sign * VIRTUAL_LOSS
+            node = tree.parent[node]
+
+    def close(self) -> None:
+        """Stops the worker processes of a parallel search."""
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+        if self.rollout_pool is not None:
+            self.rollout_pool.close()
+            self.rollout_pool.join()
+            self.rollout_pool = None
+            self.leaf_states = None
+            self.leaf_memory.close()
+            self.leaf_memory.unlink()
+            self.leaf_memory = None
 
     def select_node(self) -> tuple:
         """
         Select a node in the tree to preform a single simulation from.
 
         """
+        tree = self.tree
         node = self.root
-        state = deepcopy(self.game)
-        # print('MCTS BOARD')
-        # state.print_board()
+        state = self.game.clone()
 
         # stop if we find reach a leaf node
-        while node.is_not_leaf():
-            # print("not leaf")
-            # descend to the maximum value node, break ties at random
-            children = node.children.values()
-            max_value = max(children, key=lambda n: n.value).value
-            max_nodes = [n for n in node.children.values()
-                         if n.value == max_value]
-            node = choice(max_nodes)
-            state.play_action(node.action)
+        while not tree.is_leaf(node):
+            # untried actions have no visits, so they come first; they are stored in a
+            # random order, which breaks the tie between them
+            if tree.next_untried(node) != -1:
+                start = perf_counter()
+                node = self.add_child(node, state)
+                self.stats.expansion_time += perf_counter() - start
+            else:
+                # descend to the maximum value node, break ties at random
+                children, values = tree.uct_values(node, self.exploration, self.rave_equivalence)
+                best = np.flatnonzero(values == values.max())
+                node = children[best[np.random.randint(len(best))]]
+            state.play_action(tree.action[node])
 
             # if some child node has not been explored select it before expanding
             # other children
-            if node.N == 0:
+            if tree.visits(node) == 0:
                 return node, state
 
-        # if we reach a leaf node generate its children and return one of them
+        # if we reach a leaf node expand it and return its first child
         # if the node is terminal, just return the terminal node
-        # node.expand_node(game=state)
-        if node.expand_node(game=state) and len(node.children.values()) > 0:
-            # print(len(node.children.values()))
-            # print("expand")
-            node = choice(list(node.children.values()))
-            state.play_action(node.action)
-
-        # print(self.tree_size())
-        # print(len(self.root.children.keys()), self.root.action)
+        start = perf_counter()
+        if self.expand_node(node, state):
+            node = self.add_child(node, state)
+            state.play_action(tree.action[node])
+        self.stats.expansion_time += perf_counter() - start
+
         return node, state
-    
+
+    def expand_node(self, node: int, game: BlokusGame) -> bool:
+        """Expands a leaf by giving it the valid moves of game as untried actions.
+
+        Args:
+            node: handle of the leaf
+            game: the game state at the leaf.
+
+        Returns:
+            Whether there was any valid move.
+        """
+        actions = np.flatnonzero(game.get_valid_moves(game.current_player))
+        if len(actions) == 0:
+            return False
+        np.random.shuffle(actions)
+        self.tree.add_edges(node, actions)
+        return True
+
+    def add_child(self, node: int, game: BlokusGame) -> int:
+        """
+        Creates the child of the next untried action of node, game being the state at node,
+        and returns its handle.
+        """
+        slot = None
+        if self.transpositions is not None:
+            action = self.tree.next_untried(node)
+            key = game.canonical_child_key(action) if self.symmetry else game.child_key(action)
+            slot = self.transpositions.lookup(key, self.tree)
+        return self.tree.add_child(node, slot)
+
     @staticmethod
-    def roll_out(state: BlokusGame) -> int:
+    def roll_out(state: BlokusGame, light: bool = False) -> tuple:
         """
         Simulate an entirely random game from the passed state and return the winning
         player.
 
         Args:
             state: game state
+            light: sample each move with BlokusGame.sample_move, generating every valid
+                   move only when sampling fails
 
         Returns:
             int: winner of the game
+            list: actions played during the simulation, players alternating from the
+                  player to move in state
 
         """
         curr_player = state.current_player
         depth = 10 # play 10 moves maximum 
         current_state = state
-        while not current_state.check_game_over(current_state.current_player)[0] and depth > 0:
-            valid_moves = list(current_state.get_valid_moves(current_state.current_player))
-            moves = []
-            for idx, move in enumerate(valid_moves):
-                if move == 1:
-                    moves.append(idx)
-            if len(moves) == 0:
-                break
-            move = choice(moves)
+        actions = []
+        while depth > 0:
+            move = -1
+            if light:
+                move = current_state.sample_move(current_state.current_player)
+            if move == -1:
+                # no valid move also covers the game being over
+                moves = np.flatnonzero(current_state.get_valid_moves(current_state.current_player))
+                if len(moves) == 0:
+                    break
+                move = choice(moves)
             current_state.play_action(move)
-            moves.remove(move)
+            actions.append(int(move))
             depth -= 1
 
         if depth > 0:
-            return current_state.check_game_over(current_state.current_player)[1] * 100
+            return current_state.check_game_over(current_state.current_player)[1] * 100, actions
         else:
-            return current_state.heuristic(curr_player)
+            return current_state.heuristic(curr_player), actions
     
-    @staticmethod
-    def backup(node: Node, turn: int, outcome: int) -> None:
+    def backup(self, node: int, turn: int, outcome: int, actions: list = ()) -> None:
         """
         Update the node statistics on the path from the passed node to root to reflect
-        the outcome of a randomly simulated playout.
+        the outcome of a randomly simulated playout. With RAVE enabled, every child of a
+        node on the path whose action was played later in the simulation by the same
+        player also gets the outcome in its all-moves-as-first statistics.
 
         Args:
-            node:
+            node: handle of the node the rollout started from
             turn: winner turn
             outcome: outcome of the rollout
-
-        Returns:
-            object:
+            actions: actions played by the rollout
 
         """
-        # print("backup")
         # Careful: The reward is calculated for player who just played
         # at the node and not the next player to play
-        # reward = 0 if outcome == turn * 50 else outcome
-
-        while node is not None:
-            node.N += 1
-            node.Q += outcome
-            node = node.parent
-            # reward = 0 if reward == 50 else 50
+        tree = self.tree
+        # actions played after the current node by the player to move there, and by the other
+        mine, theirs = list(actions[0::2]), list(actions[1::2])
+        while node != -1:
+            tree.N[tree.slot[node]] += 1
+            tree.Q[tree.slot[node]] += outcome
+            parent = tree.parent[node]
+            if self.rave_equivalence > 0 and parent != -1:
+                mine, theirs = theirs + [tree.action[node]], mine
+                children = tree.children(parent)
+                later = children[np.isin(tree.action[children], mine)]
+                tree.N_RAVE[later] += 1
+                tree.Q_RAVE[later] += outcome
+            node = parent
 
     def tree_size(self) -> int:
         """
-        Count nodes in tree by BFS.
-        """
-        Q = Queue()
-        count = 0
-        Q.put(self.root)
-        while not Q.empty():
-            node = Q.get()
-            count += 1
-            for child in node.children.values():
-                Q.put(child)
-        return count
+        Count nodes in tree, the tree only holds the subtree of the root. The count is
+        kept up to date as nodes are added and pruned.
+        """
+        return self.tree.size
     
+    def book_move(self) -> int:
+        """returns the book move of the current position, -1 if there is none"""
+        if self.book is None:
+            return -1
+        return self.book.best_move(self.game)
+
     def best_move(self) -> int:
         """
         Return the best move according to the current tree.
         Returns:
             best move in terms of the most simulations number unless the game is over
         """
+        tree = self.tree
+        move = self.book_move()
+        if move != -1:
+            return move
         game_over, player = self.game.check_game_over(self.game.current_player)
-        # print("bestmove", game_over, player)
-        # print(self.game.current_player)
-        # self.game.print_board()
-        if game_over or len(self.root.children) == 0:
+        if game_over or len(tree.children(self.root)) == 0:
             return -1
 
         # choose the move of the most simulated node breaking ties randomly
-        # print(len(self.root.children))
-        max_value = max(self.root.children.values(), key=lambda n: n.N).N
-        max_nodes = [n for n in self.root.children.values() if n.N == max_value]
-        bestchild = choice(max_nodes)
-        return bestchild.action
+        children = tree.children(self.root)
+        visits = [tree.visits(child) for child in children]
+        max_value = max(visits)
+        bestchild = choice([child for child, n in zip(children, visits) if n == max_value])
+        return int(tree.action[bestchild])
 
     def move(self, move: int) -> None:
         """
@@ -281,15 +876,40 @@ class MonteCarloTreeSearch:
         Args:
             move:
         """
-        # print("move: ", move)
-        if move in self.root.children:
-            child = self.root.children[move]
-            child.parent = None
-            self.root = child
-            self.game.play_action(child.action)
-            return
+        self.game.play_action(move)
+        self.observe_move(move)
+
+    def observe_move(self, move: int) -> None:
+        """
+        Advance the root past a move that was already played on the game, e.g. by the
+        opponent, keeping the subtree of that move (and the statistics gathered for it)
+        and discarding the rest of the tree. A pass is observed as move -1.
+        Args:
+            move: the action played, or -1 for a pass
+        """
+        tree = self.tree
+        for child in tree.children(self.root):
+            if tree.action[child] == move:
+                self.tree, slots = tree.subtree(child)
+                self.root = 0
+                if self.transpositions is not None:
+                    self.transpositions.remap(slots)
+                return
 
         # if for whatever reason the move is not in the children of
         # the root just throw out the tree and start over
-        self.game.play_action(move)
-        self.root = Node()
\ No newline at end of file
+        self.new_root()
+
+    def new_root(self) -> None:
+        """
+        Starts a new tree at the current game position with fresh statistics. The
+        transposition table is emptied too, as its slots belong to the old tree.
+        """
+        self.tree = Tree(byte_limit=self.max_bytes)
+        slot = None
+        if self.transpositions is not None:
+            # the slots of the old tree are gone with it
+            self.transpositions = TranspositionTable(self.transpositions.capacity)
+            key = self.game.canonical_key() if self.symmetry else self.game.position_key()
+            slot = self.transpositions.lookup(key, self.tree)
+        self.root = self.tree.add_node(-1, -1, slot)
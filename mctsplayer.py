@@ -0,0 +1,38 @@
+import numpy as np
+from random import choice
+
+from blokus.blokus_game import BlokusGame
+from mcts import MonteCarloTreeSearch
+
+class MCTSPlayer:
+    """
+    Plays the best move of a MonteCarloTreeSearch run for time_budget seconds, or a random
+    move when the search has none. Keyword options are passed to MonteCarloTreeSearch.
+    """
+    def __init__(self, game: BlokusGame, time_budget: float, **options):
+        self.game = game
+        self.time_budget = time_budget
+        self.mcts = MonteCarloTreeSearch(game, **options)
+
+    def choose_move(self, game: BlokusGame):
+        self.mcts.search(time_budget=self.time_budget)
+        move = self.mcts.best_move()
+        if move == -1:
+            moves = np.flatnonzero(game.get_valid_moves(game.current_player))
+            if len(moves) == 0:
+                return -1
+            move = int(choice(moves))
+        return move
+
+    @property
+    def stats(self):
+        """SearchStats of the last search"""
+        return self.mcts.stats
+
+    def observe(self, move: int):
+        """keeps the search tree in step with a move (or pass, -1) played on the game"""
+        self.mcts.observe_move(move)
+
+    def move(self, move: int):
+        self.game.play_action(move)
+        self.observe(move)
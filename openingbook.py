@@ -0,0 +1,144 @@
+"""opening book: search statistics of the first plies, computed offline and stored on disk
+
+    python openingbook.py --plies 2 --width 4 --time 60 --output opening_book.npz
+"""
+import argparse
+from functools import lru_cache
+
+import numpy as np
+
+from blokus.blokus_game import BlokusGame
+from mcts import MonteCarloTreeSearch
+
+
+class OpeningBook:
+    """
+    Moves of book positions with their visit counts and mean rewards, as one structured
+    NumPy array sorted by position key, then by decreasing visits. Positions are found
+    through a dict of key -> row range.
+
+    Positions are stored in canonical form (BlokusGame.canonical_key), with their moves
+    mapped by the canonical symmetry, so symmetric positions share one entry. Books are
+    saved with VERSION, which changes with the key; other versions do not load.
+    """
+    DTYPE = np.dtype([('key', '<u8'), ('action', '<i4'), ('visits', '<i4'), ('value', '<f4')])
+    VERSION = 2
+
+    def __init__(self, entries: np.ndarray):
+        order = np.lexsort((-entries['visits'].astype(np.int64), entries['key']))
+        self.entries = entries[order]
+        keys = self.entries['key']
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        ends = np.r_[starts[1:], len(keys)]
+        self.index = {int(keys[s]): (int(s), int(e)) for s, e in zip(starts, ends)}
+        # best_move of the book positions looked up so far, by position_key
+        self.best_moves = {}
+
+    def __len__(self):
+        """number of book positions"""
+        return len(self.index)
+
+    def __contains__(self, game: BlokusGame) -> bool:
+        return game.canonical_key() in self.index
+
+    def lookup(self, game: BlokusGame) -> np.ndarray:
+        """
+        returns the book moves of the position, most visited first and mapped back from the
+        canonical form, None if not in book
+        """
+        symmetry = game.canonical_symmetry()
+        rows = self.index.get(game.symmetric_key(symmetry))
+        if rows is None:
+            return None
+        moves = self.entries[rows[0]:rows[1]].copy()
+        if symmetry:
+            moves['action'] = [game.map_action(action, symmetry) for action in moves['action']]
+        return moves
+
+    def best_move(self, game: BlokusGame) -> int:
+        """returns the most visited valid book move of the position, -1 if there is none"""
+        key = game.position_key()
+        if key in self.best_moves:
+            return self.best_moves[key]
+        moves = self.lookup(game)
+        if moves is None:
+            return -1
+        valid = game.get_valid_moves(game.current_player)
+        best = -1
+        for action in moves['action']:
+            if action >= 0 and valid[action]:
+                best = int(action)
+                break
+        self.best_moves[key] = best
+        return best
+
+    def save(self, path: str) -> None:
+        np.savez(path, entries=self.entries, version=self.VERSION)
+
+    @classmethod
+    def load(cls, path: str) -> 'OpeningBook':
+        data = np.load(path)
+        if not isinstance(data, np.lib.npyio.NpzFile) or data.get('version') != cls.VERSION:
+            raise ValueError("%s is not an opening book of version %d, rebuild it with "
+                             "openingbook.py" % (path, cls.VERSION))
+        return cls(data['entries'])
+
+
+@lru_cache(maxsize=None)
+def load_book(path: str) -> OpeningBook:
+    """loads a book once per process"""
+    return OpeningBook.load(path)
+
+
+def build_book(plies: int = 2, width: int = 4, time_budget: float = 60, min_visits: int = 1,
+               **options) -> OpeningBook:
+    """
+    Builds a book by searching every book position for time_budget seconds, starting from
+    the initial position and following the width most visited moves of each position
+    for plies plies; positions symmetric to one already searched are skipped. Moves with
+    fewer than min_visits visits are left out. Keyword options are passed to
+    MonteCarloTreeSearch.
+    """
+    rows = []
+    frontier = [[]]
+    searched = set()
+    for ply in range(plies):
+        next_frontier = []
+        for moves in frontier:
+            game = BlokusGame()
+            for move in moves:
+                game.play_action(move)
+            # symmetric positions share their book entry
+            if game.canonical_key() in searched:
+                continue
+            searched.add(game.canonical_key())
+            mcts = MonteCarloTreeSearch(game, **options)
+            stats = mcts.search(time_budget)
+            tree = mcts.tree
+            symmetry = game.canonical_symmetry()
+            key = game.symmetric_key(symmetry)
+            ranked = sorted(tree.children(mcts.root), key=tree.visits, reverse=True)
+            for child in ranked:
+                visits = int(tree.visits(child))
+                action = game.map_action(int(tree.action[child]), symmetry)
+                if visits >= min_visits and action >= 0:
+                    rows.append((key, action, visits, tree.reward(child) / visits))
+            next_frontier.extend(moves + [int(tree.action[child])] for child in ranked[:width])
+            print("ply", ply, "position", moves, stats)
+            mcts.close()
+        frontier = next_frontier
+    return OpeningBook(np.array(rows, dtype=OpeningBook.DTYPE))
+
+
+parser = argparse.ArgumentParser(description="Builds an opening book.")
+parser.add_argument("--plies", help="Number of plies in book.", type=int, default=2)
+parser.add_argument("--width", help="Moves followed from each book position.", type=int, default=4)
+parser.add_argument("--time", help="Seconds of search per book position.", type=float, default=60)
+parser.add_argument("--workers", help="Root-parallel search processes.", type=int, default=1)
+parser.add_argument("--output", help="Book file.", default="opening_book.npz")
+
+if __name__ == '__main__':
+    arguments = parser.parse_args()
+    book = build_book(arguments.plies, arguments.width, arguments.time, workers=arguments.workers)
+    book.save(arguments.output)
+    print(len(book), "positions written to", arguments.output)
@@ -0,0 +1,107 @@
+"""loading match results, from tournament records and from the older text summaries"""
+import ast
+import glob
+import json
+import os
+import re
+
+from tournament import AGENTS
+
+# columns of the table returned by load_results; the move by move columns are None for
+# games read from text summaries, seed and time_budget when unknown
+COLUMNS = ['source', 'game', 'agent1', 'agent2', 'seed', 'time_budget', 'score1', 'score2',
+           'players', 'moves', 'think_time', 'search_stats']
+
+# agent names of the text summary titles: the display names written by
+# tournament.run_tournament ("MCTS vs. Greedy Combination"), and the older titles naming
+# the greedy variant after the agents ("Greedy vs. Random, corner and size")
+TITLE_AGENTS = {display: name for name, (display, _) in AGENTS.items()}
+GREEDY_VARIANTS = {'corner maximization': 'corner', 'corner diff maximization': 'cornerdiff',
+                   'corner and size': 'combo'}
+
+GAME_LINE = re.compile(r"^Game (\d+) score: (\{.*\})$")
+
+
+def read_records(path: str) -> list:
+    """returns the rows of a JSON lines file written by tournament.run_tournament"""
+    rows = []
+    with open(path) as f:
+        for i, line in enumerate(f):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            # records are written as games finish; files without game numbers are in order
+            rows.append({'source': path, 'game': record.get('game', i + 1),
+                         'agent1': record['agents'][0], 'agent2': record['agents'][1],
+                         'seed': record['seed'], 'time_budget': record['time_budget'],
+                         'score1': record['scores'][0], 'score2': record['scores'][1],
+                         'players': record['players'], 'moves': record['moves'],
+                         'think_time': record['think_time'],
+                         'search_stats': record['search_stats']})
+    return rows
+
+
+def title_agents(title: str) -> tuple:
+    """returns the agent names of a text summary title"""
+    title, _, variant = title.partition(", ")
+    agents = []
+    for name in title.split(" vs. "):
+        if name == "Greedy":
+            agents.append(GREEDY_VARIANTS.get(variant, "greedy"))
+        else:
+            agents.append(TITLE_AGENTS.get(name, name.lower()))
+    return tuple(agents)
+
+
+def read_summary(path: str) -> list:
+    """
+    returns the rows of a text summary (results/*.txt, raw_results/*.txt): the first line
+    names the agents, then one "Game i score: {1: a, -1: b}" line per game
+    """
+    rows = []
+    with open(path) as f:
+        agent1, agent2 = title_agents(f.readline().strip())
+        # the time per move of MCTS games is the number in the file name (mcts_random_12.txt)
+        time_budget = None
+        number = re.search(r"_(\d+)", os.path.basename(path))
+        if number and 'mcts' in (agent1, agent2):
+            time_budget = float(number.group(1))
+        for line in f:
+            match = GAME_LINE.match(line.strip())
+            if match is None:
+                continue
+            score = ast.literal_eval(match.group(2))
+            rows.append({'source': path, 'game': int(match.group(1)),
+                         'agent1': agent1, 'agent2': agent2,
+                         'seed': None, 'time_budget': time_budget,
+                         'score1': score[1], 'score2': score[-1],
+                         'players': None, 'moves': None, 'think_time': None,
+                         'search_stats': None})
+    return rows
+
+
+def load_results(*paths: str) -> list:
+    """
+    Loads match results into one table, a list of rows (dicts with the keys of COLUMNS).
+    Paths may be files or directories (all their .jsonl and .txt files are read); by
+    default raw_results/ and results/ are read. A text summary with a records file of the
+    same name describes the same games and is skipped.
+    """
+    if not paths:
+        paths = ('raw_results', 'results')
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '*.jsonl')) +
+                                glob.glob(os.path.join(path, '*.txt'))))
+        elif os.path.exists(path):
+            files.append(path)
+    rows = []
+    for path in files:
+        if path.endswith('.txt') and os.path.splitext(path)[0] + '.jsonl' in files:
+            continue
+        if path.endswith('.jsonl'):
+            rows.extend(read_records(path))
+        else:
+            rows.extend(read_summary(path))
+    return rows
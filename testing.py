@@ -1,9 +1,10 @@
 """testing the different agents against each other"""
 from mcts import MonteCarloTreeSearch
 from blokus.blokus_game import BlokusGame
-from copy import deepcopy
+from blokus.batch import BatchGame
 from randplayer import RandomPlayer
 from greedyplayer import GreedyPlayer, GreedyCorner, GreedyCornerDiff, GreedyCombination
+from tournament import run_tournament, write_summary
 
 class Tester(object):
     """
@@ -15,98 +16,23 @@ class Tester(object):
         Initialize the testing class."""
         self.game = game
 
-    def start(self, num_iterations: int):
-        """playing loop"""
-        p1_win_score = 0
-        p2_win_score = 0
-        p1_win_margin = 0
-        p2_win_margin = 0
-        p1_score = 0
-        p2_score = 0
-        
-        # f = open("results/mcts_vs_mcts_12.txt", "w")
-        # f.write("MCTS vs. MCTS\n")
-        # print("MCTS vs. MCTS")
-        f = open("results/random_mcts.txt", "w")
-        f.write("Random vs. MCTS\n")
-        print("Random vs. MCTS")
-        # f = open("results/mcts_random.txt", "w")
-        # f.write("MCTS vs. Random\n")
-        # print("MCTS vs. Random")
-        for i in range(num_iterations):
-            game = deepcopy(self.game)
-            # score = self.mcts_vs_mcts(game, 12)
-            # score = self.mcts_vs_random(game, 12)
-            score = self.random_vs_mcts(game, 12)
-            # score = self.random_vs_random(game)
-            print("Game", i+1, "score:", score)
-            if score[1] > score[-1]:
-                p1_win_score += 1
-                p1_win_margin += score[1] - score[-1]
-            elif score[1] < score[-1]:
-                p2_win_score += 1
-                p2_win_margin += score[-1] - score[1]
-            else:
-                p1_win_score += 0.5
-                p2_win_score += 0.5
-            p1_score += score[1]
-            p2_score += score[-1]
-            f.write("Game " + str(i+1) + " score: " + str(score) + "\n")
-
-        print("final win score", p1_win_score, p2_win_score)
-        f.write("Final win score: " + str(p1_win_score) + " " + str(p2_win_score) + "\n")
-        f.write("Average win margin: \n")
-        if p1_win_score != 0:
-            f.write("Player 1: " + str(p1_win_margin/p1_win_score) + "\n")
-            print("Player 1: " + str(p1_win_margin/p1_win_score))
-        if p2_win_score != 0:
-            f.write("Player 2: " + str(p2_win_margin/p2_win_score) + "\n")
-            print("Player 2: " + str(p2_win_margin/p2_win_score))
-        print("average score", p1_score/num_iterations, p2_score/num_iterations)
-        f.write("Average score: " + str(p1_score/num_iterations) + " " + str(p2_score/num_iterations) + "\n")
-        f.close()
+    def start(self, num_iterations: int, agent1: str = "random", agent2: str = "mcts",
+              time: float = 12, workers: int = None, seed: int = None, output: str = None,
+              book: str = None):
+        """
+        plays num_iterations games between two agents of tournament.AGENTS in a process
+        pool, see tournament.run_tournament
+        """
+        return run_tournament(agent1, agent2, num_iterations, time, workers, seed, output, book)
     
     def start_random_vs_random(self, num_iterations: int):
-        p1_win_score = 0
-        p2_win_score = 0
-        p1_win_margin = 0
-        p2_win_margin = 0
-        p1_score = 0
-        p2_score = 0
-
-        f = open("results/random_vs_random.txt", "w")
-        f.write("Random vs. Random\n")
         print("Random vs. Random")
-
-        for i in range(num_iterations):
-            game = deepcopy(self.game)
-            score = self.random_vs_random(game)
+        # all the games are played at once, see random_vs_random for a single game
+        scores = BatchGame.from_games([self.game] * num_iterations).play_random()
+        for i, score in enumerate(scores):
             print("Game", i+1, "score:", score)
-            if score[1] > score[-1]:
-                p1_win_score += 1
-                p1_win_margin += score[1] - score[-1]
-            elif score[1] < score[-1]:
-                p2_win_score += 1
-                p2_win_margin += score[-1] - score[1]
-            else:
-                p1_win_score += 0.5
-                p2_win_score += 0.5
-            p1_score += score[1]
-            p2_score += score[-1]
-            f.write("Game " + str(i+1) + " score: " + str(score) + "\n")
-
-        print("final win score", p1_win_score, p2_win_score)
-        f.write("Final win score: " + str(p1_win_score) + " " + str(p2_win_score) + "\n")
-        f.write("Average win margin: \n")
-        if p1_win_score != 0:
-            f.write("Player 1: " + str(p1_win_margin/p1_win_score) + "\n")
-            print("Player 1: " + str(p1_win_margin/p1_win_score))
-        if p2_win_score != 0:
-            f.write("Player 2: " + str(p2_win_margin/p2_win_score) + "\n")
-            print("Player 2: " + str(p2_win_margin/p2_win_score))
-        print("average score", p1_score/num_iterations, p2_score/num_iterations)
-        f.write("Average score: " + str(p1_score/num_iterations) + " " + str(p2_score/num_iterations) + "\n")
-        f.close()
+        write_summary("Random vs. Random", scores, "results/random_vs_random.txt")
+        return scores
 
     def greedy_vs_random(self, game: BlokusGame) -> dict:
         """
@@ -164,9 +90,7 @@ class Tester(object):
                             game_over = True
                         else:
                             game.play_action(randmove)
-                            game.current_player *= -1
-                            
-                        game.current_player *= -1
+                            mcts.observe_move(randmove)
                         continue
                     mcts.move(move)
             elif game.current_player == -1:
@@ -176,9 +100,11 @@ class Tester(object):
                 move = randplayer.choose_move(game)
                 if move == -1: # pass
                     game.current_player *= -1
+                    mcts.observe_move(-1)
                     continue
                 else:
                     randplayer.move(move)
+                    mcts.observe_move(move)
         print('FINAL SCORES ARE ', game.score)
         game.print_board()
         return game.score
@@ -209,9 +135,7 @@ class Tester(object):
                             game_over = True
                         else:
                             game.play_action(randmove)
-                            game.current_player *= -1
-                            
-                        game.current_player *= -1
+                            mcts.observe_move(randmove)
                         continue
                     mcts.move(move)
             elif game.current_player == 1:
@@ -221,9 +145,11 @@ class Tester(object):
                 move = randplayer.choose_move(game)
                 if move == -1: # pass
                     game.current_player *= -1
+                    mcts.observe_move(-1)
                     continue
                 else:
                     randplayer.move(move)
+                    mcts.observe_move(move)
         # print(mcts.expanded)
         print("TREE SIZE", mcts.tree_size())
         print('FINAL SCORES ARE ', game.score)
@@ -295,9 +221,7 @@ class Tester(object):
                         game_over = True
                     else:
                         game.play_action(randmove)
-                        game.current_player *= -1
-                        
-                    game.current_player *= -1
+                        mcts.observe_move(randmove)
                     continue
 
                 mcts.move(move)
@@ -0,0 +1,60 @@
+"""BatchGame against BlokusGame"""
+import random
+
+import numpy as np
+
+from blokus.batch import BatchGame
+from blokus.blokus_game import BlokusGame
+
+
+def random_positions(count, plies, seed):
+    """returns count games after up to plies random moves each"""
+    rng = random.Random(seed)
+    games = []
+    for k in range(count):
+        game = BlokusGame()
+        for _ in range(rng.randrange(plies)):
+            moves = np.flatnonzero(game.get_valid_moves(game.current_player))
+            if len(moves) == 0:
+                break
+            game.play_action(int(rng.choice(moves)))
+        games.append(game)
+    return games
+
+
+def test_roll_out_scores_like_blokus_game():
+    games = random_positions(40, 36, seed=5)
+    batch = BatchGame.from_games(games, seed=5)
+    outcomes, actions = batch.roll_out(depth=10)
+    for game, outcome, played in zip(games, outcomes.tolist(), actions):
+        state = game.clone()
+        start = state.current_player
+        for move in played:
+            assert state.get_valid_moves(state.current_player)[move]
+            state.play_action(move)
+        if len(played) == 10:
+            assert outcome == state.heuristic(start)
+        else:
+            assert not state.get_valid_moves(state.current_player).any()
+            assert outcome == state.check_game_over(state.current_player)[1] * 100
+
+
+def test_valid_moves_match_blokus_game():
+    batch = BatchGame(30, seed=7)
+    games = [BlokusGame() for _ in range(30)]
+    while not batch.done().all():
+        valid = batch.valid_moves()
+        moves = batch.sample_moves(valid)
+        for k, game in enumerate(games):
+            if batch.done()[k]:
+                continue
+            assert game.current_player == batch.current_player[k]
+            assert np.array_equal(valid[k], game.get_valid_moves(game.current_player).astype(bool))
+            if moves[k] >= 0:
+                game.play_action(int(moves[k]))
+            else:
+                game.current_player *= -1
+        batch.play(moves)
+    for k, game in enumerate(games):
+        assert np.array_equal(batch.boards[k], game.state)
+        assert batch.scores()[k] == game.score
@@ -0,0 +1,42 @@
+"""bitboard checks of BlokusGame against the legal move masks"""
+import random
+
+import numpy as np
+
+from blokus.blokus_game import BlokusGame
+from blokus.placements import get_table
+
+
+def test_valid_action_matches_legal_mask():
+    table = get_table()
+    rng = random.Random(11)
+    for _ in range(5):
+        game = BlokusGame()
+        while game.has_any_move(1) or game.has_any_move(-1):
+            for player in [1, -1]:
+                legal = game.generate_legal_mask(player)
+                pieces = game.pieces[player]
+                for (i, j) in game.corners[player]:
+                    base = (i * game.size + j) * 91
+                    checked = [(pieces >> int(table.piece[a])) & 1 == 1 and game.valid_action(a, player)
+                               for a in range(base, base + 91)]
+                    assert np.array_equal(checked, legal[base:base + 91])
+                    assert np.array_equal(game.corner_moves(player, i, j),
+                                          legal[base:base + 91] & ~table.invalid[base:base + 91])
+            moves = np.flatnonzero(game.get_valid_moves(game.current_player))
+            if len(moves) == 0:
+                game.current_player *= -1
+            else:
+                game.play_action(int(rng.choice(moves)))
+
+
+def test_undo_clears_bitboards():
+    game = BlokusGame()
+    for _ in range(6):
+        game.play_action(int(np.flatnonzero(game.get_valid_moves(game.current_player))[0]))
+    for player in [1, -1]:
+        cells = np.flatnonzero(game.state.reshape(-1) == player)
+        assert game.bitboards[player] == sum(1 << int(c) for c in cells)
+    for _ in range(6):
+        game.undo_action()
+    assert game.bitboards == {1: 0, -1: 0}
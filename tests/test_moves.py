@@ -0,0 +1,35 @@
+"""move generation of BlokusGame: incremental legal moves against generation from scratch"""
+import random
+
+import numpy as np
+
+from blokus.blokus_game import BlokusGame
+
+
+def test_incremental_moves_match_generation_from_scratch():
+    rng = random.Random(4)
+    for _ in range(8):
+        game = BlokusGame()
+        while game.has_any_move(1) or game.has_any_move(-1):
+            for player in [1, -1]:
+                assert np.array_equal(game.get_valid_moves(player), game.generate_valid_moves(player))
+                if game.rounds >= 2:
+                    assert np.array_equal(game.legal[player], game.generate_legal_mask(player))
+            moves = np.flatnonzero(game.get_valid_moves(game.current_player))
+            if len(moves) == 0:
+                game.current_player *= -1
+            else:
+                game.play_action(int(rng.choice(moves)))
+
+
+def test_find_move_matches_valid_moves():
+    rng = random.Random(9)
+    game = BlokusGame()
+    while game.has_any_move(1) or game.has_any_move(-1):
+        for player in [1, -1]:
+            assert game.find_move(player) == bool(game.get_valid_moves(player).any())
+        moves = np.flatnonzero(game.get_valid_moves(game.current_player))
+        if len(moves) == 0:
+            game.current_player *= -1
+        else:
+            game.play_action(int(rng.choice(moves)))
@@ -0,0 +1,49 @@
+"""board symmetries: transpose exactness and agreement of the symmetric keys"""
+import random
+
+import numpy as np
+
+from blokus.blokus_game import BlokusGame
+from blokus.placements import get_table
+from blokus.symmetry import TRANSPOSE, get_symmetries
+
+
+def test_transpose_is_the_only_exact_symmetry():
+    assert get_symmetries().exact == [0, TRANSPOSE]
+
+
+def test_transposed_positions():
+    table = get_table()
+    rng = random.Random(1)
+    for _ in range(4):
+        game = BlokusGame()
+        while True:
+            legal = np.array(game.get_legal_moves(game.current_player), dtype=np.int64)
+            if len(legal) == 0:
+                break
+            image = game.transformed(TRANSPOSE)
+            assert np.array_equal(image.state, game.state.T)
+            assert image.position_key() == game.symmetric_key(TRANSPOSE)
+
+            # legal moves map onto legal moves; the valid moves only differ on the ids of
+            # invalid_moves.txt listed without their transposes
+            mapped = np.array([game.map_action(a, TRANSPOSE) for a in legal], dtype=np.int64)
+            image_legal = np.array(image.get_legal_moves(image.current_player), dtype=np.int64)
+            assert set(table.placement[mapped].tolist()) == set(table.placement[image_legal].tolist())
+            valid = np.flatnonzero(game.get_valid_moves(game.current_player))
+            image_valid = np.flatnonzero(image.get_valid_moves(image.current_player))
+            image_valid = set(table.placement[image_valid].tolist())
+            for action in valid:
+                if table.placement[game.map_action(action, TRANSPOSE)] not in image_valid:
+                    assert table.invalid[game.map_action(action, TRANSPOSE)]
+
+            action = int(rng.choice(legal))
+            child_key = game.canonical_child_key(action)
+            hashes = dict(game.symmetric_hash)
+            game.play_action(action)
+            assert game.canonical_key() == child_key
+            assert game.canonical_form().position_key() == game.canonical_key()
+            assert BlokusGame.from_array(game.to_array()).symmetric_hash == game.symmetric_hash
+            game.undo_action()
+            assert game.symmetric_hash == hashes
+            game.play_action(action)
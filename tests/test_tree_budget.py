@@ -0,0 +1,29 @@
+"""memory budget of the MCTS tree"""
+import numpy as np
+
+from blokus.blokus_game import BlokusGame
+from mcts import MonteCarloTreeSearch
+
+
+class PeakSearch(MonteCarloTreeSearch):
+    """records the largest allocation of the tree arrays seen between iterations"""
+    peak = 0
+
+    def over_budget(self, share=1.0):
+        self.peak = max(self.peak, self.tree.allocated)
+        return super().over_budget(share)
+
+
+def test_allocated_bytes_stay_within_budget():
+    np.random.seed(3)
+    budget = 60000
+    mcts = PeakSearch(BlokusGame(), max_bytes=budget, light_rollouts=True)
+    stats = mcts.search(iterations=400)
+    assert stats.pruned_nodes > 0
+    # one expansion may go past the budget before the tree is pruned
+    assert mcts.peak <= budget + 2000
+    tree = mcts.tree
+    assert sum(len(tree.children(node)) for node in range(tree.size)) == tree.size - 1
+
+    mcts.move(mcts.best_move())
+    assert mcts.tree.allocated == mcts.tree.nbytes
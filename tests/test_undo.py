@@ -0,0 +1,50 @@
+"""play_action / undo_action / clone round trips of BlokusGame"""
+import random
+
+import numpy as np
+
+from blokus.blokus_game import BlokusGame
+
+
+def snapshot(game):
+    """returns the mutable state of a game as comparable values"""
+    return (game.state.tobytes(), dict(game.score), {p: set(c) for p, c in game.corners.items()},
+            dict(game.pieces), {p: game.legal[p].tobytes() for p in game.legal},
+            game.hash, dict(game.symmetric_hash), game.rounds, game.current_player)
+
+
+def random_moves(game, count, rng):
+    """plays up to count random valid moves, returns the snapshots before each move"""
+    before = []
+    for _ in range(count):
+        moves = np.flatnonzero(game.get_valid_moves(game.current_player))
+        if len(moves) == 0:
+            break
+        before.append(snapshot(game))
+        game.play_action(int(rng.choice(moves)))
+    return before
+
+
+def test_undo_restores_every_position():
+    rng = random.Random(2023)
+    for _ in range(5):
+        game = BlokusGame()
+        before = random_moves(game, 20, rng)
+        for expected in reversed(before):
+            game.undo_action()
+            assert snapshot(game) == expected
+
+
+def test_clone_undo_leaves_original_unchanged():
+    rng = random.Random(7)
+    game = BlokusGame()
+    before = random_moves(game, 8, rng)
+    current = snapshot(game)
+    clone = game.clone()
+    random_moves(clone, 4, rng)
+    for _ in range(len(before) + 4):
+        clone.undo_action()
+    assert snapshot(game) == current
+    for expected in reversed(before):
+        game.undo_action()
+        assert snapshot(game) == expected
@@ -0,0 +1,162 @@
+"""playing matches between two agents in a pool of worker processes"""
+import json
+import os
+import random
+from multiprocessing import Pool
+from time import perf_counter
+
+import numpy as np
+
+from blokus.blokus_game import BlokusGame
+from greedyplayer import GreedyCombination, GreedyCorner, GreedyCornerDiff
+from mctsplayer import MCTSPlayer
+from openingbook import load_book
+from randplayer import RandomPlayer
+
+# agent name: (display name, constructor taking the game, the time per move and the
+# opening book or None)
+AGENTS = {
+    'random': ('Random', lambda game, time_budget, book: RandomPlayer(game)),
+    'corner': ('Greedy Corner', lambda game, time_budget, book: GreedyCorner(game, book)),
+    'cornerdiff': ('Greedy Corner Diff', lambda game, time_budget, book: GreedyCornerDiff(game, book)),
+    'combo': ('Greedy Combination', lambda game, time_budget, book: GreedyCombination(game, book)),
+    'mcts': ('MCTS', lambda game, time_budget, book: MCTSPlayer(game, time_budget, book=book)),
+}
+
+
+def play_game(game: BlokusGame, players: dict, record: dict = None) -> dict:
+    """
+    Plays a game to the end between players {1: agent, -1: agent}, passing whenever the
+    player to move has no move. Agents with an observe method are told every move.
+
+    If record is given, the players, moves (-1 for a pass), think times in seconds and
+    search stats (SearchStats.as_dict without the root visits, None for agents that do not
+    search) of every move are appended to its lists of the same names.
+    """
+    while not game.check_game_over(game.current_player)[0]:
+        player = players[game.current_player]
+        start = perf_counter()
+        move = player.choose_move(game)
+        think_time = perf_counter() - start
+        if record is not None:
+            record['players'].append(game.current_player)
+            record['moves'].append(int(move))
+            record['think_time'].append(think_time)
+            stats = None
+            if hasattr(player, 'stats'):
+                stats = player.stats.as_dict()
+                del stats['root_visits']
+            record['search_stats'].append(stats)
+        if move == -1: # pass
+            game.current_player *= -1
+        else:
+            game.play_action(move)
+        for player in players.values():
+            if hasattr(player, 'observe'):
+                player.observe(move)
+    return game.score
+
+
+def play_match(job: tuple) -> dict:
+    """
+    Plays one game in a worker process.
+
+    Args:
+        job: (game number, agent of player 1, agent of player -1, time per move, seed,
+              opening book file or None)
+
+    Returns:
+        The record of the game: game number, agents, seed, time per move, final scores of
+        players 1 and -1 and the move by move lists filled by play_game.
+    """
+    number, agent1, agent2, time_budget, seed, book = job
+    random.seed(seed)
+    np.random.seed(seed % 2 ** 32)
+    game = BlokusGame()
+    if book is not None:
+        book = load_book(book)
+    players = {1: AGENTS[agent1][1](game, time_budget, book),
+               -1: AGENTS[agent2][1](game, time_budget, book)}
+    record = {'game': number, 'agents': [agent1, agent2], 'seed': seed, 'time_budget': time_budget,
+              'players': [], 'moves': [], 'think_time': [], 'search_stats': []}
+    score = play_game(game, players, record)
+    record['scores'] = [score[1], score[-1]]
+    return record
+
+
+def run_tournament(agent1: str, agent2: str, num_games: int, time_budget: float = 12,
+                   workers: int = None, seed: int = None, output: str = None,
+                   book: str = None) -> list:
+    """
+    Plays num_games games between two agents (names in AGENTS, agent1 moving first) in a
+    pool of worker processes, game i using seed + i, and writes the summary to output
+    (results/<agent1>_<agent2>.txt by default). The record of every game (see play_match)
+    is written to the JSON lines file next to it (same name, .jsonl) as soon as the game
+    is over, so records are in order of completion. Like the summary, the records file
+    is rewritten by every run; results.load_results reads both. Agents other than random
+    play the moves of the opening book file book while in book.
+
+    Returns:
+        The scores of the games, in game order.
+    """
+    if seed is None:
+        seed = random.getrandbits(32)
+    if output is None:
+        output = os.path.join("results", agent1 + "_" + agent2 + ".txt")
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    jobs = [(i + 1, agent1, agent2, time_budget, seed + i, book) for i in range(num_games)]
+    title = AGENTS[agent1][0] + " vs. " + AGENTS[agent2][0]
+    print(title)
+    scores = [None] * num_games
+    with Pool(workers) as pool, open(os.path.splitext(output)[0] + ".jsonl", "w") as records:
+        for record in pool.imap_unordered(play_match, jobs):
+            score = {1: record['scores'][0], -1: record['scores'][1]}
+            print("Game", record['game'], "score:", score)
+            scores[record['game'] - 1] = score
+            records.write(json.dumps(record) + "\n")
+            records.flush()
+    write_summary(title, scores, output)
+    return scores
+
+
+def write_summary(title: str, scores: list, output: str) -> None:
+    """writes the games' scores, win score, average win margin and average score to output"""
+    p1_win_score = 0
+    p2_win_score = 0
+    p1_win_margin = 0
+    p2_win_margin = 0
+    p1_score = 0
+    p2_score = 0
+    num_games = len(scores)
+
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    f = open(output, "w")
+    f.write(title + "\n")
+    for i, score in enumerate(scores):
+        if score[1] > score[-1]:
+            p1_win_score += 1
+            p1_win_margin += score[1] - score[-1]
+        elif score[1] < score[-1]:
+            p2_win_score += 1
+            p2_win_margin += score[-1] - score[1]
+        else:
+            p1_win_score += 0.5
+            p2_win_score += 0.5
+        p1_score += score[1]
+        p2_score += score[-1]
+        f.write("Game " + str(i+1) + " score: " + str(score) + "\n")
+
+    print("final win score", p1_win_score, p2_win_score)
+    f.write("Final win score: " + str(p1_win_score) + " " + str(p2_win_score) + "\n")
+    f.write("Average win margin: \n")
+    if p1_win_score != 0:
+        f.write("Player 1: " + str(p1_win_margin/p1_win_score) + "\n")
+        print("Player 1: " + str(p1_win_margin/p1_win_score))
+    if p2_win_score != 0:
+        f.write("Player 2: " + str(p2_win_margin/p2_win_score) + "\n")
+        print("Player 2: " + str(p2_win_margin/p2_win_score))
+    print("average score", p1_score/num_games, p2_score/num_games)
+    f.write("Average score: " + str(p1_score/num_games) + " " + str(p2_score/num_games) + "\n")
+    f.close()